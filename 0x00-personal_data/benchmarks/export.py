@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Compare the previous row-by-row main() loop with export_users on a
+SQLite users table of N rows (time and peak traced memory)
+
+    python3 -m benchmarks.export [N] [BATCH]
+"""
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from filtered_logger import PII_FIELDS, RedactingFormatter, export_users
+
+COLUMNS = ("name", "email", "phone", "ssn", "password", "ip", "last_login",
+           "user_agent")
+
+
+def legacy_export(db_conn, logger: logging.Logger) -> None:
+    """
+    The users loop of main() before export_users.
+    """
+    cursor = db_conn.cursor()
+    cursor.execute("SELECT * FROM users;")
+    fields = [column[0] for column in cursor.description]
+    for row in cursor.fetchall():
+        message = "".join("{}={}; ".format(k, v) for k, v in zip(fields, row))
+        logger.info(message.strip())
+    cursor.close()
+
+
+def make_db(path: str, n: int) -> None:
+    """
+    Create a users table with `n` rows in the SQLite file `path`.
+    """
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users ({})".format(
+        ", ".join("{} TEXT".format(c) for c in COLUMNS)))
+    conn.executemany(
+        "INSERT INTO users VALUES ({})".format(", ".join("?" * len(COLUMNS))),
+        (("name{}".format(i), "user{}@example.com".format(i), "555-0100",
+          "000-00-0000", "hash{}".format(i), "10.0.0.1",
+          "2019-11-14 06:16:24", "Mozilla/5.0") for i in range(n)))
+    conn.commit()
+    conn.close()
+
+
+def run(name: str, export, path: str) -> None:
+    """
+    Time one export to /dev/null and print its peak traced memory.
+    """
+    logger = logging.getLogger("bench_{}".format(name))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = logging.StreamHandler(open(os.devnull, "w"))
+    handler.setFormatter(RedactingFormatter(list(PII_FIELDS)))
+    logger.addHandler(handler)
+    conn = sqlite3.connect(path)
+    tracemalloc.start()
+    started = time.perf_counter()
+    export(conn, logger)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    conn.close()
+    print("  {:<14} {:7.2f} s   peak {:8.1f} MiB".format(
+        name, elapsed, peak / 2 ** 20))
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    os.remove(path)
+    try:
+        make_db(path, n)
+        print("{} rows".format(n))
+        run("row by row", legacy_export, path)
+        run("export_users", lambda conn, logger:
+            export_users(conn, logger, batch), path)
+    finally:
+        os.remove(path)
@@ -2,21 +2,51 @@
 """
 Utility functions for password hashing and database operations.
 """
-import bcrypt
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from hashing import get_pool
+
+# calibrate the bcrypt cost on import rather than on the first hash
+get_pool()
 
 
 def hash_password(password: str) -> bytes:
     """
     Hashes a password using bcrypt and returns the salted, hashed password.
     """
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode(), salt)
-    return hashed
+    return get_pool().hash(password)
 
 
-def is_valid(hashed_password: bytes, password: str) -> bool:
+def is_valid(hashed_password: bytes, password: str,
+             on_rehash: Optional[Callable[[bytes], None]] = None) -> bool:
     """
     Validates that the provided password
     matches the hashed password.
+
+    If it matches but was hashed with another bcrypt cost than the
+    calibrated one, the password is rehashed and passed to `on_rehash`
+    so the caller can store it.
+    """
+    pool = get_pool()
+    if not pool.check(password, hashed_password):
+        return False
+    if on_rehash is not None and pool.needs_rehash(hashed_password):
+        on_rehash(pool.hash(password))
+    return True
+
+
+def hash_password_async(password: str) -> Future:
+    """
+    Schedules the hashing of a password and returns a future
+    resolving to the salted, hashed password.
+    """
+    return get_pool().submit_hash(password)
+
+
+def is_valid_async(hashed_password: bytes, password: str) -> Future:
+    """
+    Schedules the validation of a password and returns a future
+    resolving to True if it matches the hashed password.
     """
-    return bcrypt.checkpw(password.encode(), hashed_password)
+    return get_pool().submit_check(password, hashed_password)
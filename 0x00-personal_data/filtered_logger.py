@@ -2,25 +2,62 @@
 """
 Obfuscates specified fields in a log message.
 """
+import copy
 import re
-from typing import List
+from functools import lru_cache
+from typing import Callable, List, Match, Pattern, Tuple, Union
+import atexit
 import logging
+import logging.handlers
 import os
-import mysql.connector
+import queue
+import sqlite3
+
+try:
+    import mysql.connector
+except ImportError:
+    mysql = None
 
 
 PII_FIELDS = ("name", "email", "phone", "ssn", "password")
 
 
+@lru_cache(maxsize=64)
+def compile_redaction(
+    fields: Tuple[str, ...], redaction: str, separator: str
+) -> Tuple[Pattern, Union[str, Callable[[Match], str]]]:
+    """
+    Compiles the pattern matching the fields, and the replacement that
+    redacts their values.
+
+    Plain field names are matched with one lookbehind per name length,
+    so the replacement is a constant string that `re.sub` applies
+    without calling back into Python for each match. Fields that are
+    regular expressions keep the generic per-match replacement.
+    """
+    if fields and all(re.escape(field) == field for field in fields):
+        by_length = {}
+        for field in fields:
+            by_length.setdefault(len(field), []).append(field)
+        pattern = "=(?:{}).*?(?={}|$)".format(
+            "|".join("(?<=(?:{})=)".format("|".join(same_length))
+                     for same_length in by_length.values()),
+            separator)
+        return re.compile(pattern), "=" + redaction.replace("\\", r"\\")
+    pattern = "|".join(f"{field}=.*?(?={separator}|$)" for field in fields)
+    return re.compile(pattern), lambda m: \
+        f"{m.group().split('=')[0]}={redaction}"
+
+
 def filter_datum(
     fields: List[str], redaction: str, message: str, separator: str
 ) -> str:
     """
     Obfuscates specified fields in a log message.
     """
-    pattern = "|".join(f"{field}=.*?(?={separator}|$)" for field in fields)
-    return re.sub(pattern, lambda m:
-                  f"{m.group().split('=')[0]}={redaction}", message)
+    pattern, replacement = compile_redaction(tuple(fields), redaction,
+                                             separator)
+    return pattern.sub(replacement, message)
 
 
 class RedactingFormatter(logging.Formatter):
@@ -36,22 +73,84 @@ class RedactingFormatter(logging.Formatter):
         """
         super(RedactingFormatter, self).__init__(self.FORMAT)
         self.fields = fields
+        self._pattern, self._replacement = compile_redaction(
+            tuple(fields), self.REDACTION, self.SEPARATOR)
 
     def format(self, record: logging.LogRecord) -> str:
         """
         Format the log record by obfuscating specified fields.
         """
         original_msg = super(RedactingFormatter, self).format(record)
-        return filter_datum(self.fields, self.REDACTION,
-                            original_msg, self.SEPARATOR)
+        return self._pattern.sub(self._replacement, original_msg)
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler over a bounded queue that either drops records or
+    blocks the caller when the queue is full.
+    """
+
+    def __init__(self, maxsize: int = 10000, policy: str = "drop"):
+        """
+        Initialize the handler with its queue size and full-queue policy
+        ("drop" or "block").
+        """
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unknown queue policy: {policy}")
+        super(BoundedQueueHandler, self).__init__(queue.Queue(maxsize))
+        self.policy = policy
+        self.dropped = 0
+        self.listener = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Merge the message arguments only, in a copy of the record since
+        other handlers may still use it; formatting and redaction are
+        left to the listener thread.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """
+        Queue a record, applying the full-queue policy.
+        """
+        if self.policy == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self) -> dict:
+        """
+        Return the current queue depth and the number of dropped records.
+        """
+        return {"queue_depth": self.queue.qsize(), "dropped": self.dropped}
 
 
-def get_logger() -> logging.Logger:
+def get_logger(asynchronous: bool = None, maxsize: int = None,
+               policy: str = None) -> logging.Logger:
     """
     Creates a logger named 'user_data' with INFO level
     and a StreamHandler that uses RedactingFormatter
     to obfuscate PII fields.
+
+    In asynchronous mode (opt-in, with PERSONAL_DATA_LOG_ASYNC=1), records
+    go through a BoundedQueueHandler of `maxsize` records
+    (PERSONAL_DATA_LOG_QUEUE_SIZE) with the `policy` "drop" or "block"
+    (PERSONAL_DATA_LOG_QUEUE_POLICY); a QueueListener thread redacts
+    and writes them.
     """
+    if asynchronous is None:
+        asynchronous = os.getenv('PERSONAL_DATA_LOG_ASYNC') == '1'
 
     logger = logging.getLogger("user_data")
     logger.setLevel(logging.INFO)
@@ -61,15 +160,35 @@ def get_logger() -> logging.Logger:
     formatter = RedactingFormatter(list(PII_FIELDS))
     stream_handler.setFormatter(formatter)
 
-    logger.addHandler(stream_handler)
+    if not asynchronous:
+        logger.addHandler(stream_handler)
+        return logger
+
+    if maxsize is None:
+        maxsize = int(os.getenv('PERSONAL_DATA_LOG_QUEUE_SIZE', 10000))
+    if policy is None:
+        policy = os.getenv('PERSONAL_DATA_LOG_QUEUE_POLICY', 'drop')
+    queue_handler = BoundedQueueHandler(maxsize, policy)
+    queue_handler.listener = logging.handlers.QueueListener(
+        queue_handler.queue, stream_handler)
+    queue_handler.listener.start()
+    atexit.register(queue_handler.listener.stop)
+
+    logger.addHandler(queue_handler)
     return logger
 
 
-def get_db() -> mysql.connector.connection.MySQLConnection:
+def get_db() -> "mysql.connector.connection.MySQLConnection":
     """
     Connects to the MySQL database using
     credentials from environment variables.
+
+    With PERSONAL_DATA_DB_ENGINE=sqlite, opens the SQLite database file
+    PERSONAL_DATA_DB_NAME instead, as a local stand-in.
     """
+    if os.getenv('PERSONAL_DATA_DB_ENGINE') == 'sqlite':
+        return sqlite3.connect(os.getenv('PERSONAL_DATA_DB_NAME',
+                                         ':memory:'))
     user = os.getenv('PERSONAL_DATA_DB_USERNAME', 'root')
     passwd = os.getenv('PERSONAL_DATA_DB_PASSWORD', '')
     host = os.getenv('PERSONAL_DATA_DB_HOST', 'localhost')
@@ -81,6 +200,60 @@ def get_db() -> mysql.connector.connection.MySQLConnection:
     return conn
 
 
+def log_batch(logger: logging.Logger, level: int,
+              messages: List[str]) -> None:
+    """
+    Logs a batch of messages: stream handlers format the whole batch
+    and write it with a single call, other handlers get each record.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    records = [logger.makeRecord(logger.name, level, "(unknown file)", 0,
+                                 message, None, None)
+               for message in messages]
+    records = [record for record in records if logger.filter(record)]
+    for handler in logger.handlers:
+        if level < handler.level:
+            continue
+        if isinstance(handler, logging.StreamHandler):
+            text = "".join(handler.format(record) + handler.terminator
+                           for record in records if handler.filter(record))
+            with handler.lock:
+                handler.stream.write(text)
+                handler.flush()
+        else:
+            for record in records:
+                handler.handle(record)
+
+
+def export_users(db_conn, logger: logging.Logger,
+                 batch_size: int = 1000) -> int:
+    """
+    Streams the users table to the logger `batch_size` rows at a time
+    through an unbuffered cursor, and returns the number of rows.
+    """
+    try:
+        cursor = db_conn.cursor(buffered=False)
+    except TypeError:
+        cursor = db_conn.cursor()
+    try:
+        cursor.execute("SELECT * FROM users;")
+        prefixes = ["{}=".format(column[0]) for column in cursor.description]
+        count = 0
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            log_batch(logger, logging.INFO, [
+                "; ".join(prefix + str(value)
+                          for prefix, value in zip(prefixes, row)) + ";"
+                for row in rows])
+            count += len(rows)
+    finally:
+        cursor.close()
+    return count
+
+
 def main():
     """
     Main function to retrieve and print user data
@@ -88,15 +261,8 @@ def main():
     """
     db_conn = get_db()
     logger = get_logger()
-    cursor = db_conn.cursor()
-    cursor.execute("SELECT * FROM users;")
-    fields = cursor.column_names
-
-    for row in cursor:
-        message = "".join("{}={}; ".format(k, v) for k, v in zip(fields, row))
-        logger.info(message.strip())
-
-    cursor.close()
+    export_users(db_conn, logger,
+                 int(os.getenv('PERSONAL_DATA_EXPORT_BATCH', 1000)))
     db_conn.close()
 
 
@@ -6,6 +6,7 @@ from os import getenv
 from api.v1.views import app_views
 from flask import Flask, jsonify, abort, request
 from flask_cors import CORS
+from api.v1.auth.path_matcher import PathMatcher
 import os
 
 app = Flask(__name__)
@@ -24,6 +25,12 @@ elif AUTH_TYPE == "basic_auth":
 
     auth = BasicAuth()
 
+EXCLUDED_PATHS = PathMatcher([
+    "/api/v1/status/",
+    "/api/v1/unauthorized/",
+    "/api/v1/forbidden/",
+])
+
 
 @app.before_request
 def before_request():
@@ -32,12 +39,7 @@ def before_request():
     authentication and authorization checks
     """
     if auth is not None:
-        excluded_paths = [
-            "/api/v1/status/",
-            "/api/v1/unauthorized/",
-            "/api/v1/forbidden/",
-        ]
-        if auth.require_auth(request.path, excluded_paths):
+        if auth.require_auth(request.path, EXCLUDED_PATHS):
             if auth.authorization_header(request) is None:
                 abort(401, description="Unauthorized")
             if auth.current_user(request) is None:
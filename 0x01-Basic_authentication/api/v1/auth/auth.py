@@ -3,7 +3,8 @@
 Definition of class Auth
 """
 from flask import request
-from typing import List, Optional, TypeVar
+from api.v1.auth.path_matcher import PathMatcher, compile_paths
+from typing import List, Optional, TypeVar, Union
 
 
 class Auth:
@@ -11,14 +12,16 @@ class Auth:
     Manages the API authentication.
     """
 
-    def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
+    def require_auth(self, path: str,
+                     excluded_paths: Union[List[str], PathMatcher]) -> bool:
         """
         Determine if a given path requires authentication.
 
         Args:
             path (str): URL path to be checked.
-            excluded_paths (List[str]): List of paths that
-            do not require authentication.
+            excluded_paths (Union[List[str], PathMatcher]): Paths that
+            do not require authentication, or their matcher built once
+            at app start.
 
         Returns:
             bool: True if the path requires authentication,
@@ -26,19 +29,11 @@ class Auth:
         """
         if path is None:
             return True
-        if not excluded_paths:
-            return True
-        if path in excluded_paths:
-            return False
-
-        for excluded_path in excluded_paths:
-            if excluded_path.endswith("*"):
-                if path.startswith(excluded_path[:-1]):
-                    return False
-            elif excluded_path == path or path.startswith(excluded_path + "/"):
-                return False
-
-        return True
+        if not isinstance(excluded_paths, PathMatcher):
+            if not excluded_paths:
+                return True
+            excluded_paths = compile_paths(tuple(excluded_paths))
+        return not excluded_paths.match(path)
 
     def authorization_header(self, request=None) -> Optional[str]:
         """
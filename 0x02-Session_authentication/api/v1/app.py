@@ -10,6 +10,7 @@ from typing import Dict, Tuple
 
 from flask import Flask, jsonify, abort, request
 from flask_cors import CORS, cross_origin
+from api.v1.auth.path_matcher import PathMatcher
 import logging
 
 
@@ -55,6 +56,17 @@ elif auth_type == "session_db_auth":
 
     auth = SessionDBAuth()
 
+# views read it from here: importing api.v1.app would run this module a
+# second time, with a new auth, when it is run as __main__
+app.extensions["auth"] = auth
+
+EXCLUDED_PATHS = PathMatcher([
+    "/api/v1/status/",
+    "/api/v1/unauthorized/",
+    "/api/v1/forbidden/",
+    "/api/v1/auth_session/login/",
+])
+
 
 @app.errorhandler(404)
 def not_found(_) -> Tuple[Dict, int]:
@@ -87,26 +99,15 @@ def before_request():
     authentication and authorization checks
     """
     if auth is not None:
-        excluded_paths = [
-            "/api/v1/status/",
-            "/api/v1/unauthorized/",
-            "/api/v1/forbidden/",
-            "/api/v1/auth_session/login/",
-        ]
-        if auth.require_auth(request.path, excluded_paths):
-            user = auth.current_user(request)
-            if (
-                auth.authorization_header(request) is None
-                and auth.session_cookie(request) is None
-            ):
+        if auth.require_auth(request.path, EXCLUDED_PATHS):
+            context = auth.authenticate(request)
+            if context.credentials is None:
                 logging.debug("Authorization header & session cookie missing")
                 abort(401, description="Unauthorized")
-            if auth.current_user(request) is None:
+            if context.user is None:
                 logging.debug("Forbidden: No current user")
                 abort(403, description="Forbidden")
-            if user is None:
-                abort(403)
-            request.current_user = user
+            request.current_user = context.user
 
 
 if __name__ == "__main__":
@@ -3,23 +3,37 @@
 Definition of class Auth
 """
 from flask import request
-from typing import List, Optional, TypeVar
+from api.v1.auth.path_matcher import PathMatcher, compile_paths
+from typing import Dict, List, NamedTuple, Optional, TypeVar, Union
 import os
 
 
+class AuthContext(NamedTuple):
+    """
+    Credentials of a request (its Authorization header, else its
+    session cookie) and the user they resolve to.
+    """
+    credentials: Optional[str]
+    user: Optional[TypeVar("User")]
+
+
 class Auth:
     """
     Manages the API authentication.
     """
 
-    def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
+    session_name = os.getenv("SESSION_NAME", "_my_session_id")
+
+    def require_auth(self, path: str,
+                     excluded_paths: Union[List[str], PathMatcher]) -> bool:
         """
         Determine if a given path requires authentication.
 
         Args:
             path (str): URL path to be checked.
-            excluded_paths (List[str]): List of paths that
-            do not require authentication.
+            excluded_paths (Union[List[str], PathMatcher]): Paths that
+            do not require authentication, or their matcher built once
+            at app start.
 
         Returns:
             bool: True if the path requires authentication,
@@ -27,19 +41,11 @@ class Auth:
         """
         if path is None:
             return True
-        if not excluded_paths:
-            return True
-        if path in excluded_paths:
-            return False
-
-        for excluded_path in excluded_paths:
-            if excluded_path.endswith("*"):
-                if path.startswith(excluded_path[:-1]):
-                    return False
-            elif excluded_path == path or path.startswith(excluded_path + "/"):
-                return False
-
-        return True
+        if not isinstance(excluded_paths, PathMatcher):
+            if not excluded_paths:
+                return True
+            excluded_paths = compile_paths(tuple(excluded_paths))
+        return not excluded_paths.match(path)
 
     def authorization_header(self, request=None) -> Optional[str]:
         """
@@ -82,6 +88,39 @@ class Auth:
         """
         if request is None:
             return None
+        return request.cookies.get(self.session_name)
+
+    def authenticate(self, request=None) -> AuthContext:
+        """
+        Resolve the credentials of a request and its user, once, for
+        before_request to check both and keep the user on the request.
 
-        session_name = os.getenv("SESSION_NAME", "_my_session_id")
-        return request.cookies.get(session_name)
+        Args:
+            request: The incoming request object.
+
+        Returns:
+            AuthContext: The credentials and current user of the
+            request, no user being looked up without credentials.
+        """
+        if request is None:
+            return AuthContext(None, None)
+        # every attribute read through flask.request's proxy looks the
+        # request up again
+        get_request = getattr(request, "_get_current_object", None)
+        if get_request is not None:
+            request = get_request()
+        credentials = self.authorization_header(request)
+        if credentials is None:
+            credentials = self.session_cookie(request)
+        if credentials is None:
+            return AuthContext(None, None)
+        return AuthContext(credentials, self.current_user(request))
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Return the counters of the authentication mechanism.
+
+        Returns:
+            Dict[str, dict]: Counters by component, empty by default.
+        """
+        return {}
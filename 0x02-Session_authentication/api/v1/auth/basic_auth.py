@@ -3,8 +3,12 @@
 Definition of class BasicAuth
 """
 import base64
+import hashlib
+import hmac
+import os
 from .auth import Auth
-from typing import TypeVar, Tuple, Optional
+from .session_store import SessionStore
+from typing import Dict, TypeVar, Tuple, Optional
 
 from models.user import User
 
@@ -12,6 +16,29 @@ from models.user import User
 class BasicAuth(Auth):
     """Basic Authorization protocol implementation"""
 
+    def __init__(self):
+        """
+        Initialize the verified-credential cache.
+
+        The cache maps a keyed hash of the raw Authorization header to
+        the authenticated user. It is configured by BASIC_AUTH_CACHE
+        ("0" disables it), BASIC_AUTH_CACHE_TTL (seconds) and
+        BASIC_AUTH_CACHE_SIZE (entries).
+        """
+        self.credential_cache = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_invalidations = 0
+        if os.getenv("BASIC_AUTH_CACHE", "1") == "0":
+            return
+        try:
+            self.cache_ttl = int(os.getenv("BASIC_AUTH_CACHE_TTL", 60))
+            cache_size = int(os.getenv("BASIC_AUTH_CACHE_SIZE", 10000))
+        except ValueError:
+            self.cache_ttl, cache_size = 60, 10000
+        self._cache_secret = os.urandom(32)
+        self.credential_cache = SessionStore(max_size=cache_size)
+
     def extract_base64_authorization_header(
         self, authorization_header: str
     ) -> Optional[str]:
@@ -102,16 +129,46 @@ class BasicAuth(Auth):
             if not users:
                 return None
             for u in users:
-                if u.is_valid_passwd(user_pwd):
+                if u.is_valid_password(user_pwd):
                     return u
             return None
         except Exception:
             return None
 
+    def _cached_user(self, key: bytes) -> Optional[TypeVar("User")]:
+        """
+        Retrieve the User a cached header was verified for.
+
+        The entry is dropped if the user has been removed, or if their
+        email or password changed since the header was verified.
+
+        Args:
+            key (bytes): Keyed hash of the Authorization header.
+
+        Returns:
+            Optional[TypeVar('User')]: The User if the entry is still
+            valid, otherwise None.
+        """
+        entry = self.credential_cache.get(key)
+        if entry is None:
+            self.cache_misses += 1
+            return None
+        user_id, email, password = entry
+        user = User.get(user_id)
+        if user is None or user.email != email or \
+                user.password != password:
+            self.credential_cache.delete(key)
+            self.cache_invalidations += 1
+            self.cache_misses += 1
+            return None
+        self.cache_hits += 1
+        return user
+
     def current_user(self, request=None) -> Optional[TypeVar("User")]:
         """
         Retrieve a User instance from the request based on the
-        Authorization header.
+        Authorization header, going through the verified-credential
+        cache when it is enabled.
 
         Args:
             request: The incoming request object.
@@ -121,6 +178,34 @@ class BasicAuth(Auth):
             are valid, otherwise None.
         """
         auth_header = self.authorization_header(request)
+        if self.credential_cache is None or \
+                not isinstance(auth_header, str):
+            return self.user_from_authorization_header(auth_header)
+
+        key = hmac.new(self._cache_secret, auth_header.encode("utf-8"),
+                       hashlib.sha256).digest()
+        user = self._cached_user(key)
+        if user is None:
+            user = self.user_from_authorization_header(auth_header)
+            if user is not None:
+                self.credential_cache.set(
+                    key, (user.id, user.email, user.password),
+                    ttl=self.cache_ttl)
+        return user
+
+    def user_from_authorization_header(
+        self, auth_header: str
+    ) -> Optional[TypeVar("User")]:
+        """
+        Decode an Authorization header and verify its credentials.
+
+        Args:
+            auth_header (str): The Authorization header of the request.
+
+        Returns:
+            Optional[TypeVar('User')]: A User instance if credentials
+            are valid, otherwise None.
+        """
         if auth_header:
             token = self.extract_base64_authorization_header(auth_header)
             if token:
@@ -130,3 +215,20 @@ class BasicAuth(Auth):
                     if email:
                         return self.user_object_from_credentials(email, passwd)
         return None
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Return the counters of the verified-credential cache.
+
+        Returns:
+            Dict[str, dict]: Cache size, hits, misses and invalidations,
+            empty if the cache is disabled.
+        """
+        if self.credential_cache is None:
+            return {}
+        return {"credential_cache": {
+            "size": len(self.credential_cache),
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "invalidations": self.cache_invalidations,
+        }}
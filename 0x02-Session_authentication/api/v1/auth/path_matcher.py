@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Definition of class PathMatcher
+"""
+from functools import lru_cache
+from typing import Iterable, Tuple
+
+
+class _Node:
+    """
+    Node of the character trie of a PathMatcher.
+    """
+
+    __slots__ = ("children", "exact", "subtree", "wildcard")
+
+    def __init__(self):
+        """
+        Initialize a node with no children and matching nothing.
+        """
+        self.children = {}
+        self.exact = False
+        self.subtree = False
+        self.wildcard = False
+
+
+class PathMatcher:
+    """
+    Matches paths against excluded path rules in O(path length),
+    however many rules there are.
+
+    Rules follow Auth.require_auth:
+    - "/api/v1/stat*" matches every path starting with "/api/v1/stat"
+    - "/api/v1/status/" matches "/api/v1/status" and "/api/v1/status/"
+    - "/api/v1/users" matches itself, "/api/v1/users/" and the paths
+      below it, like "/api/v1/users/me"
+    """
+
+    def __init__(self, rules: Iterable[str] = ()):
+        """
+        Build the trie of the rules.
+        """
+        self.rules = tuple(rules)
+        self._root = _Node()
+        for rule in self.rules:
+            if rule.endswith("*"):
+                self._insert(rule[:-1]).wildcard = True
+                continue
+            node = self._insert(rule)
+            node.exact = node.subtree = True
+            if rule.endswith("/"):
+                self._insert(rule[:-1]).exact = True
+
+    def _insert(self, prefix: str) -> _Node:
+        """
+        Return the node of a prefix, creating the missing ones.
+        """
+        node = self._root
+        for c in prefix:
+            child = node.children.get(c)
+            if child is None:
+                child = node.children[c] = _Node()
+            node = child
+        return node
+
+    def match(self, path: str) -> bool:
+        """
+        Tell whether a path matches one of the rules.
+        """
+        node = self._root
+        last = len(path) - 1
+        for i, c in enumerate(path):
+            if node.wildcard:
+                return True
+            if c == "/" and (node.subtree or (node.exact and i == last)):
+                return True
+            node = node.children.get(c)
+            if node is None:
+                return False
+        return node.wildcard or node.exact
+
+    def __len__(self) -> int:
+        """
+        Number of rules.
+        """
+        return len(self.rules)
+
+
+@lru_cache(maxsize=32)
+def compile_paths(rules: Tuple[str, ...]) -> PathMatcher:
+    """
+    Build, once per distinct list of rules, the matcher of the rules.
+    """
+    return PathMatcher(rules)
@@ -4,8 +4,9 @@ Definition of class SessionAuth
 """
 import base64
 from uuid import uuid4
-from typing import TypeVar, Optional
+from typing import Dict, TypeVar, Optional
 from .auth import Auth
+from .session_store import session_store_from_env
 from models.user import User
 
 
@@ -15,7 +16,7 @@ class SessionAuth(Auth):
     managing user sessions.
     """
 
-    user_id_by_session_id = {}
+    user_id_by_session_id = session_store_from_env()
 
     def create_session(self, user_id: Optional[str] = None) -> Optional[str]:
         """
@@ -58,5 +59,11 @@ class SessionAuth(Auth):
         user_id = self.user_id_for_session_id(session_cookie)
         if user_id is None:
             return False
-        del self.user_id_by_session_id[session_cookie]
+        self.user_id_by_session_id.delete(session_cookie)
         return True
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Returns the counters of the session store.
+        """
+        return {"sessions": self.user_id_by_session_id.stats()}
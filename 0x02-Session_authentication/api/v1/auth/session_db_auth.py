@@ -3,10 +3,12 @@
 """
 This module implements session authentication that is saved in database.
 """
-from datetime import datetime, timedelta
+import os
 from typing import TypeVar, Union
+from uuid import uuid4
 
 from api.v1.auth.session_exp_auth import SessionExpAuth
+from api.v1.auth.session_store import UserSessionStore
 from models.user_session import UserSession as DBUserSession
 
 UserSession = TypeVar("UserSession")
@@ -15,19 +17,31 @@ UserSession = TypeVar("UserSession")
 class SessionDBAuth(SessionExpAuth):
     """Implement Session Authentication with data persistence."""
 
+    def __init__(self):
+        """
+        Initialize the session store, configured by SESSION_DURATION,
+        SESSION_DB_FLUSH_INTERVAL and SESSION_DB_FLUSH_BATCH (batched
+        writes) and SESSION_DB_SWEEP_INTERVAL (expired sessions purge).
+        """
+        super().__init__()
+        try:
+            flush_interval = float(os.getenv("SESSION_DB_FLUSH_INTERVAL", 1))
+            flush_batch = int(os.getenv("SESSION_DB_FLUSH_BATCH", 1000))
+            sweep_interval = float(os.getenv("SESSION_DB_SWEEP_INTERVAL",
+                                             60))
+        except ValueError:
+            flush_interval, flush_batch, sweep_interval = 1, 1000, 60
+        self.user_id_by_session_id = UserSessionStore(
+            ttl=self.session_duration, flush_interval=flush_interval,
+            flush_batch=flush_batch, sweep_interval=sweep_interval)
+
     @staticmethod
     def get_db_session(session_id: str) -> Union[UserSession, None]:
-        """Return the UserSession based on the `session_id`."""
-        if not session_id:
+        """Return the UserSession based on the `session_id`, which is
+        also its ID."""
+        if not session_id or not isinstance(session_id, str):
             return None
-
-        try:
-            session: UserSession = DBUserSession.search(
-                {"session_id": session_id})[0]
-        except (KeyError, IndexError):
-            return None
-
-        return session
+        return DBUserSession.get(session_id)
 
     def create_session(self, user_id: str = None) -> Union[str, None]:
         """
@@ -41,36 +55,19 @@ class SessionDBAuth(SessionExpAuth):
             str | None: The session ID is returned if everything goes
             alright, else None is returned if an invalid user ID was given.
         """
-        session_id: Union[str, None] = super().create_session(user_id=user_id)
-        if not session_id:
+        if user_id is None or not isinstance(user_id, str):
             return None
-
-        session = DBUserSession(session_id=session_id,
-                                user_id=user_id, id=session_id)
-        session.save()
-
-        return session.session_id
+        session_id = str(uuid4())
+        self.user_id_by_session_id.set(session_id, user_id)
+        return session_id
 
     def user_id_for_session_id(self, session_id:
                                str = None) -> Union[str, None]:
         """Return the User ID representing the UserSession in the database
-        based on the `session_id`."""
-        session = self.get_db_session(session_id=session_id)
-        if not session:
-            return None
-
-        if self.session_duration <= 0:
-            return session.user_id
-
-        if not session.created_at:
-            return None
-
-        if datetime.now() > session.created_at + timedelta(
-            seconds=self.session_duration
-        ):
+        based on the `session_id`, None if the session has expired."""
+        if not session_id or not isinstance(session_id, str):
             return None
-
-        return session.user_id
+        return self.user_id_by_session_id.get(session_id)
 
     def destroy_session(self, request=None) -> bool:
         """Delete user session from database."""
@@ -81,13 +78,6 @@ class SessionDBAuth(SessionExpAuth):
         if not session_id:
             return False
 
-        user_id = self.user_id_for_session_id(session_id=session_id)
-        if not user_id:
+        if not self.user_id_for_session_id(session_id=session_id):
             return False
-
-        session = self.get_db_session(session_id=session_id)
-        if not session:
-            return False
-
-        session.remove()
-        return True
+        return self.user_id_by_session_id.delete(session_id)
@@ -30,10 +30,10 @@ class SessionExpAuth(SessionAuth):
         if not session_id:
             return None
 
-        SessionExpAuth.user_id_by_session_id[session_id] = {
+        SessionExpAuth.user_id_by_session_id.set(session_id, {
             "user_id": user_id,
             "created_at": datetime.now(),
-        }
+        }, ttl=self.session_duration)
 
         return session_id
 
@@ -0,0 +1,636 @@
+#!/usr/bin/env python3
+"""
+Definition of the session stores used by SessionAuth
+"""
+import atexit
+import hashlib
+import heapq
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict
+
+from models.base import EPOCH
+from models.user_session import UserSession
+
+
+class BaseSessionStore:
+    """
+    Mapping-like interface shared by the session stores.
+    """
+
+    sweep_interval = 1.0
+    _sweeper_lock = threading.Lock()
+    _sweeper_pid = None
+
+    def set(self, key: str, value: Any, ttl: float = 0) -> None:
+        """
+        Store a value, expiring it after `ttl` seconds if `ttl` > 0.
+        """
+        raise NotImplementedError
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Return the value stored for a key, or `default` if the key is
+        missing or expired.
+        """
+        raise NotImplementedError
+
+    def delete(self, key: str) -> bool:
+        """
+        Remove a key, returning whether it was present.
+        """
+        raise NotImplementedError
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        """
+        Store a value without expiry.
+        """
+        self.set(key, value)
+
+    def __getitem__(self, key: str) -> Any:
+        """
+        Return the value of a key or raise KeyError.
+        """
+        marker = object()
+        value = self.get(key, marker)
+        if value is marker:
+            raise KeyError(key)
+        return value
+
+    def __delitem__(self, key: str) -> None:
+        """
+        Remove a key or raise KeyError.
+        """
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        """
+        Tell whether a key is stored and not expired.
+        """
+        marker = object()
+        return self.get(key, marker) is not marker
+
+    def sweep(self) -> int:
+        """
+        Remove every expired entry and return how many were removed.
+        """
+        raise NotImplementedError
+
+    def _start_sweeper(self) -> None:
+        """
+        Start the background expiry thread, once per process since
+        threads don't survive a fork.
+        """
+        with self._sweeper_lock:
+            if self._sweeper_pid == os.getpid():
+                return
+            self._sweeper_pid = os.getpid()
+            threading.Thread(target=self._sweep_forever, daemon=True).start()
+
+    def _sweep_forever(self) -> None:
+        """
+        Background loop removing expired entries.
+        """
+        while True:
+            time.sleep(self.sweep_interval)
+            self.sweep()
+
+
+class SessionStore(BaseSessionStore):
+    """
+    In-memory session store split into lock-striped shards.
+
+    Entries may carry a time-to-live: a background thread pops them
+    from a per-shard expiry heap once their deadline has passed. Heap
+    entries left behind by deletes, evictions and overwrites are counted
+    and the heap is rebuilt once they make up half of it.
+
+    An optional hard cap evicts the least recently used entries of a
+    shard; it is split between the shards so the store never holds more
+    than `max_size` entries.
+    """
+
+    compact_min_stale = 64
+
+    def __init__(self, shards: int = 16, max_size: int = 0,
+                 sweep_interval: float = 1.0):
+        """
+        Initialize the store.
+
+        Args:
+            shards (int): Number of independently locked shards.
+            max_size (int): Maximum number of entries, 0 for no limit;
+                there are at most `max_size` shards.
+            sweep_interval (float): Seconds between two expiry sweeps.
+        """
+        if max_size > 0:
+            shards = min(shards, max_size)
+        self._shards = [OrderedDict() for _ in range(shards)]
+        self._deadlines = [{} for _ in range(shards)]
+        self._heaps = [[] for _ in range(shards)]
+        self._stale = [0] * shards
+        self._locks = [threading.Lock() for _ in range(shards)]
+        if max_size > 0:
+            self._shard_caps = [max_size // shards +
+                                (1 if i < max_size % shards else 0)
+                                for i in range(shards)]
+        else:
+            self._shard_caps = [0] * shards
+        self.sweep_interval = sweep_interval
+        self._hits = [0] * shards
+        self._misses = [0] * shards
+        self._expired = [0] * shards
+        self._evicted = [0] * shards
+
+    def _shard(self, key: str) -> int:
+        """
+        Return the index of the shard holding a key.
+        """
+        return hash(key) % len(self._shards)
+
+    def _drop_deadline(self, i: int, key: str) -> None:
+        """
+        Forget the deadline of a key of shard `i`, counting its heap
+        entry as stale; the lock of the shard must be held.
+        """
+        if self._deadlines[i].pop(key, None) is not None:
+            self._stale[i] += 1
+
+    def _compact(self, i: int) -> None:
+        """
+        Rebuild the heap of shard `i` without its stale entries once they
+        make up half of it; the lock of the shard must be held.
+        """
+        if self._stale[i] < max(self.compact_min_stale,
+                                len(self._heaps[i]) // 2):
+            return
+        heap = [(deadline, key)
+                for key, deadline in self._deadlines[i].items()]
+        heapq.heapify(heap)
+        self._heaps[i] = heap
+        self._stale[i] = 0
+
+    def set(self, key: str, value: Any, ttl: float = 0) -> None:
+        """
+        Store a value, expiring it after `ttl` seconds if `ttl` > 0.
+        """
+        i = self._shard(key)
+        with self._locks[i]:
+            shard = self._shards[i]
+            shard[key] = value
+            shard.move_to_end(key)
+            self._drop_deadline(i, key)
+            if ttl > 0:
+                deadline = time.monotonic() + ttl
+                self._deadlines[i][key] = deadline
+                heapq.heappush(self._heaps[i], (deadline, key))
+            cap = self._shard_caps[i]
+            while cap and len(shard) > cap:
+                old_key, _ = shard.popitem(last=False)
+                self._drop_deadline(i, old_key)
+                self._evicted[i] += 1
+            self._compact(i)
+        if ttl > 0 and self._sweeper_pid != os.getpid():
+            self._start_sweeper()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Return the value stored for a key, or `default` if the key is
+        missing or expired.
+        """
+        i = self._shard(key)
+        with self._locks[i]:
+            shard = self._shards[i]
+            if key not in shard:
+                self._misses[i] += 1
+                return default
+            deadline = self._deadlines[i].get(key)
+            if deadline is not None and deadline <= time.monotonic():
+                del shard[key]
+                self._drop_deadline(i, key)
+                self._expired[i] += 1
+                self._misses[i] += 1
+                return default
+            shard.move_to_end(key)
+            self._hits[i] += 1
+            return shard[key]
+
+    def delete(self, key: str) -> bool:
+        """
+        Remove a key, returning whether it was present.
+        """
+        i = self._shard(key)
+        with self._locks[i]:
+            if key not in self._shards[i]:
+                return False
+            del self._shards[i][key]
+            self._drop_deadline(i, key)
+            self._compact(i)
+            return True
+
+    def __len__(self) -> int:
+        """
+        Number of stored entries, including expired ones not yet swept.
+        """
+        return sum(len(shard) for shard in self._shards)
+
+    def sweep(self) -> int:
+        """
+        Remove every expired entry and return how many were removed.
+        """
+        removed = 0
+        now = time.monotonic()
+        for i in range(len(self._heaps)):
+            with self._locks[i]:
+                heap = self._heaps[i]
+                deadlines = self._deadlines[i]
+                while heap and heap[0][0] <= now:
+                    deadline, key = heapq.heappop(heap)
+                    # the key may have been deleted or re-set since
+                    if deadlines.get(key) == deadline:
+                        del deadlines[key]
+                        del self._shards[i][key]
+                        self._expired[i] += 1
+                        removed += 1
+                    elif self._stale[i]:
+                        self._stale[i] -= 1
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the size and the hit, miss and eviction counters.
+        """
+        return {
+            "size": len(self),
+            "hits": sum(self._hits),
+            "misses": sum(self._misses),
+            "expired": sum(self._expired),
+            "evicted": sum(self._evicted),
+        }
+
+
+class SQLiteSessionStore(BaseSessionStore):
+    """
+    Session store shared by every process of a host.
+
+    Sessions live in a SQLite database in WAL mode, by default on the
+    /dev/shm tmpfs, so gunicorn workers see each other's sessions.
+    Values are stored as JSON; datetimes are preserved.
+
+    The default database is named after the user and the working
+    directory (where the app keeps its .db_*.json files), so two apps
+    on a host never share their sessions.
+    """
+
+    def __init__(self, db_path: str = None, sweep_interval: float = 1.0):
+        """
+        Initialize the store.
+
+        Args:
+            db_path (str): Path of the SQLite database.
+            sweep_interval (float): Seconds between two expiry sweeps.
+        """
+        if db_path is None:
+            db_path = self.default_db_path()
+        self.db_path = db_path
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+        self._counters_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)")
+
+    @staticmethod
+    def default_db_path() -> str:
+        """
+        Path of the database of the app run by this user from the
+        working directory, on /dev/shm when available.
+        """
+        shm = "/dev/shm"
+        db_dir = shm if os.path.isdir(shm) else tempfile.gettempdir()
+        user = os.getuid() if hasattr(os, "getuid") else os.getenv(
+            "USERNAME", "")
+        app = hashlib.sha1(os.getcwd().encode()).hexdigest()[:12]
+        return os.path.join(db_dir, "session_store_{}_{}.db".format(
+            user, app))
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Return the connection of the current thread and process.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            fd = os.open(self.db_path, os.O_RDWR | os.O_CREAT, 0o600)
+            os.close(fd)
+            conn = sqlite3.connect(self.db_path, timeout=5,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _encode(value: Any) -> str:
+        """
+        Serialize a value to JSON, tagging datetimes.
+        """
+        def default(obj):
+            """
+            Tag a datetime, which json.dumps can't encode.
+            """
+            if isinstance(obj, datetime):
+                return {"__datetime__": obj.isoformat()}
+            raise TypeError("{} is not JSON serializable".format(obj))
+        return json.dumps(value, default=default)
+
+    @staticmethod
+    def _decode(raw: str) -> Any:
+        """
+        Deserialize a value encoded by `_encode`.
+        """
+        def object_hook(obj):
+            """
+            Turn a tagged datetime back into a datetime.
+            """
+            if len(obj) == 1 and "__datetime__" in obj:
+                return datetime.fromisoformat(obj["__datetime__"])
+            return obj
+        return json.loads(raw, object_hook=object_hook)
+
+    def _count(self, hits: int = 0, misses: int = 0, expired: int = 0):
+        """
+        Update the counters of this process.
+        """
+        with self._counters_lock:
+            self._hits += hits
+            self._misses += misses
+            self._expired += expired
+
+    def set(self, key: str, value: Any, ttl: float = 0) -> None:
+        """
+        Store a value, expiring it after `ttl` seconds if `ttl` > 0.
+        """
+        expires_at = time.time() + ttl if ttl > 0 else None
+        self._connection().execute(
+            "INSERT OR REPLACE INTO sessions (key, value, expires_at) "
+            "VALUES (?, ?, ?)", (key, self._encode(value), expires_at))
+        if ttl > 0 and self._sweeper_pid != os.getpid():
+            self._start_sweeper()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Return the value stored for a key, or `default` if the key is
+        missing or expired.
+        """
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM sessions WHERE key = ?",
+            (key,)).fetchone()
+        if row is None:
+            self._count(misses=1)
+            return default
+        if row[1] is not None and row[1] <= time.time():
+            self._count(misses=1)
+            return default
+        self._count(hits=1)
+        return self._decode(row[0])
+
+    def delete(self, key: str) -> bool:
+        """
+        Remove a key, returning whether it was present.
+        """
+        cursor = self._connection().execute(
+            "DELETE FROM sessions WHERE key = ?", (key,))
+        return cursor.rowcount > 0
+
+    def __len__(self) -> int:
+        """
+        Number of stored entries, including expired ones not yet swept.
+        """
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def sweep(self) -> int:
+        """
+        Remove every expired entry and return how many were removed.
+        """
+        cursor = self._connection().execute(
+            "DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+        self._count(expired=cursor.rowcount)
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the shared size and the counters of this process.
+        """
+        return {
+            "size": len(self),
+            "hits": self._hits,
+            "misses": self._misses,
+            "expired": self._expired,
+            "evicted": 0,
+        }
+
+
+class UserSessionStore(BaseSessionStore):
+    """
+    Session store persisted as UserSession objects, whose ID is the
+    session ID, for SessionDBAuth.
+
+    - lookups go through the primary key of UserSession
+    - writes are applied in memory and flushed to the file in batches,
+      every `flush_interval` seconds or `flush_batch` changes, and at
+      exit
+    - every session expires `ttl` seconds after its creation (never if
+      `ttl` <= 0), and a background thread removes the expired ones
+      every `sweep_interval` seconds; the `ttl` of `set` is ignored
+    - the thread flushing and sweeping is started again by the first
+      change in a forked process
+    """
+
+    def __init__(self, ttl: float = 0, flush_interval: float = 1.0,
+                 flush_batch: int = 1000, sweep_interval: float = 60.0):
+        """
+        Initialize the store and load the stored sessions.
+
+        Args:
+            ttl (float): Lifetime of the sessions in seconds.
+            flush_interval (float): Seconds between two flushes.
+            flush_batch (int): Changes triggering an immediate flush.
+            sweep_interval (float): Seconds between two expiry sweeps.
+        """
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.sweep_interval = sweep_interval
+        self._lock = threading.RLock()
+        self._dirty = 0
+        self._heap = []
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._flushes = 0
+        UserSession.load_from_file()
+        if self.ttl > 0:
+            self._heap = [(self._deadline(session), session.id)
+                          for session in UserSession.all()]
+            heapq.heapify(self._heap)
+        atexit.register(self.flush)
+        self._start_sweeper()
+
+    def _deadline(self, session: UserSession) -> float:
+        """
+        Expiry time of a session, in seconds since the epoch (UTC).
+        """
+        return (session.created_at - EPOCH).total_seconds() + self.ttl
+
+    @staticmethod
+    def _now() -> float:
+        """
+        Current time, in seconds since the epoch (UTC).
+        """
+        return (datetime.utcnow() - EPOCH).total_seconds()
+
+    def _changed(self) -> None:
+        """
+        Count a change, flushing once `flush_batch` are pending; the
+        lock must be held.
+        """
+        self._dirty += 1
+        if self._dirty >= self.flush_batch:
+            self.flush()
+
+    def set(self, key: str, value: Any, ttl: float = 0) -> None:
+        """
+        Store the user ID of a session.
+        """
+        with self._lock:
+            session = UserSession(user_id=value, session_id=key, id=key)
+            session.save(persist=False)
+            if self.ttl > 0:
+                heapq.heappush(self._heap, (self._deadline(session), key))
+            self._changed()
+        if self._sweeper_pid != os.getpid():
+            self._start_sweeper()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Return the user ID of a session, or `default` if the session is
+        missing or expired.
+        """
+        session = UserSession.get(key)
+        if session is None or (self.ttl > 0 and
+                               self._deadline(session) <= self._now()):
+            self._misses += 1
+            return default
+        self._hits += 1
+        return session.user_id
+
+    def delete(self, key: str) -> bool:
+        """
+        Remove a session, returning whether it was present.
+        """
+        with self._lock:
+            session = UserSession.get(key)
+            if session is None:
+                return False
+            session.remove(persist=False)
+            self._changed()
+        if self._sweeper_pid != os.getpid():
+            self._start_sweeper()
+        return True
+
+    def __len__(self) -> int:
+        """
+        Number of stored sessions, including expired ones not yet swept.
+        """
+        return UserSession.count()
+
+    def sweep(self) -> int:
+        """
+        Remove every expired session and return how many were removed.
+        """
+        removed = 0
+        now = self._now()
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, key = heapq.heappop(self._heap)
+                session = UserSession.get(key)
+                # the session may have been deleted or re-created since
+                if session is not None and \
+                        self._deadline(session) == deadline:
+                    session.remove(persist=False)
+                    removed += 1
+            if removed:
+                self._expired += removed
+                self._changed()
+        return removed
+
+    def flush(self) -> None:
+        """
+        Write the pending changes to the file.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            UserSession.save_to_file()
+            self._dirty = 0
+            self._flushes += 1
+
+    def _sweep_forever(self) -> None:
+        """
+        Background loop flushing pending changes and removing expired
+        sessions.
+        """
+        last_sweep = time.monotonic()
+        while True:
+            time.sleep(self.flush_interval)
+            if self.ttl > 0 and \
+                    time.monotonic() - last_sweep >= self.sweep_interval:
+                self.sweep()
+                last_sweep = time.monotonic()
+            self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the size, the hit, miss and expiry counters, and the
+        pending changes and flushes.
+        """
+        return {
+            "size": len(self),
+            "hits": self._hits,
+            "misses": self._misses,
+            "expired": self._expired,
+            "evicted": 0,
+            "pending_writes": self._dirty,
+            "flushes": self._flushes,
+        }
+
+
+def session_store_from_env() -> BaseSessionStore:
+    """
+    Build the session store selected by SESSION_BACKEND.
+
+    - "sqlite": SQLiteSessionStore at SESSION_DB_PATH (by default, one
+      per user and working directory)
+    - otherwise: SessionStore sized by SESSION_STORE_SHARDS and
+      SESSION_MAX_COUNT
+    """
+    if os.getenv("SESSION_BACKEND") == "sqlite":
+        return SQLiteSessionStore(db_path=os.getenv("SESSION_DB_PATH"))
+    try:
+        shards = int(os.getenv("SESSION_STORE_SHARDS", 16))
+        max_size = int(os.getenv("SESSION_MAX_COUNT", 0))
+    except ValueError:
+        shards, max_size = 16, 0
+    return SessionStore(shards=max(shards, 1), max_size=max_size)
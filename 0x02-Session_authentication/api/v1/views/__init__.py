@@ -2,6 +2,7 @@
 """
 DocDocDocDocDocDoc
 """
+from os import getenv
 from flask import Blueprint
 
 app_views = Blueprint("app_views", __name__, url_prefix="/api/v1")
@@ -9,4 +10,4 @@ app_views = Blueprint("app_views", __name__, url_prefix="/api/v1")
 from api.v1.views.index import *
 from api.v1.views.users import *
 
-User.load_from_file()
+User.load_from_file(lazy=getenv("DB_LAZY_LOAD") == "1")
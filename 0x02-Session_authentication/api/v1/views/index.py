@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """ Module for Index Views
 """
-from flask import jsonify, abort
+from flask import abort, current_app, jsonify
 from api.v1.views import app_views
 
 
@@ -41,9 +41,13 @@ def stats() -> str:
     GET /api/v1/stats
     Retrieve statistics about the number of objects.
     - Returns a JSON response with the count of users from the User model.
+    - Also returns the counters of the authentication mechanism, if any.
     """
     from models.user import User
 
+    auth = current_app.extensions.get("auth")
     stats = {}
     stats["users"] = User.count()
+    if auth is not None:
+        stats.update(auth.stats())
     return jsonify(stats)
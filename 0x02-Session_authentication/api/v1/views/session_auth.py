@@ -4,8 +4,7 @@
 Session Authentication Module For Views
 """
 
-import os
-from flask import jsonify, request, abort
+from flask import abort, current_app, jsonify, request
 from api.v1.views import app_views
 from models.user import User
 
@@ -31,12 +30,10 @@ def auth_session():
 
     for user in users:
         if user.is_valid_password(password):
-            from api.v1.app import auth
-
+            auth = current_app.extensions["auth"]
             session_id = auth.create_session(user.id)
             resp = jsonify(user.to_json())
-            session_name = os.getenv("SESSION_NAME", "_my_session_id")
-            resp.set_cookie(session_name, session_id)
+            resp.set_cookie(auth.session_name, session_id)
             return resp
 
     return jsonify({"error": "wrong password"}), 401
@@ -48,8 +45,7 @@ def handle_logout():
     """
     Handle user logout.
     """
-    from api.v1.app import auth
-
+    auth = current_app.extensions["auth"]
     if auth.destroy_session(request):
         return jsonify({}), 200
     abort(404)
@@ -2,18 +2,89 @@
 """ Module of Users views
 """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from base64 import b64decode, urlsafe_b64encode
+from binascii import Error as Base64Error
+from flask import Response, abort, jsonify, request, stream_with_context
+from models.storage import dumps
 from models.user import User
+from models.user_bulk import export_users, import_users, iter_lines
+from typing import Iterator, Optional
+
+PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+STREAM_BATCH = 1000
+
+
+def encode_cursor(user_id: str) -> str:
+    """ Opaque cursor pointing after a user ID
+    """
+    return urlsafe_b64encode(user_id.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[str]:
+    """ User ID of a cursor, None if the cursor is invalid
+    """
+    try:
+        return b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_",
+                         validate=True).decode()
+    except (Base64Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def stream_users(after: Optional[str] = None) -> Iterator[str]:
+    """ Yield the JSON array of the users after the ID `after` in
+    chunks of STREAM_BATCH users, never holding more than one chunk
+    """
+    yield "["
+    separator = ""
+    while True:
+        users = User.page(after=after, limit=STREAM_BATCH)
+        if not users:
+            break
+        yield separator + ",".join(dumps(user.to_json()) for user in users)
+        separator = ","
+        after = users[-1].id
+    yield "]\n"
 
 
 @app_views.route("/users", methods=["GET"], strict_slashes=False)
 def view_all_users() -> str:
     """GET /api/v1/users
+    Query parameters (all optional):
+      - limit: page size (1 to 1000); returns one page of users
+      - after: cursor returned as "next" by the previous page
+      - stream: "1" to stream the whole list, starting after `after`
     Return:
-      - list of all User objects JSON represented
+      - list of all User objects JSON represented, without parameters
+      - {"users": [...], "next": cursor or null} with `limit`/`after`
+      - 400 if the limit or the cursor is invalid
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    after = request.args.get("after")
+    if after is not None:
+        after = decode_cursor(after)
+        if after is None:
+            return jsonify({"error": "invalid cursor"}), 400
+
+    if request.args.get("stream") == "1":
+        return Response(stream_with_context(stream_users(after)),
+                        mimetype="application/json")
+
+    limit = request.args.get("limit")
+    if limit is None and after is None:
+        all_users = [user.to_json() for user in User.all()]
+        return jsonify(all_users)
+    try:
+        limit = int(limit) if limit is not None else PAGE_LIMIT
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        return jsonify({"error": "invalid limit"}), 400
+    users = User.page(after=after, limit=limit)
+    next_cursor = None
+    if len(users) == limit:
+        next_cursor = encode_cursor(users[-1].id)
+    return jsonify({"users": [user.to_json() for user in users],
+                    "next": next_cursor})
 
 
 @app_views.route("/users/<user_id>", methods=["GET"], strict_slashes=False)
@@ -95,6 +166,31 @@ def create_user() -> str:
     return jsonify({"error": error_msg}), 400
 
 
+@app_views.route("/users/import", methods=["POST"], strict_slashes=False)
+def import_all_users() -> str:
+    """POST /api/v1/users/import
+    NDJSON body: one JSON object per line, with the fields of
+    POST /api/v1/users, read and hashed by chunks in the request
+    thread (python3 -m models.user_bulk import uses several processes)
+    Return:
+      - {"created": number of users, "errors": [{"line", "error"}]}
+        with 201 if at least one user was created, 400 otherwise
+    """
+    created, errors = import_users(iter_lines(request.stream))
+    return jsonify({"created": created, "errors": errors}), \
+        201 if created else 400
+
+
+@app_views.route("/users/export", methods=["GET"], strict_slashes=False)
+def export_all_users() -> str:
+    """GET /api/v1/users/export
+    Return:
+      - streamed NDJSON of all User objects JSON represented, in ID order
+    """
+    return Response(stream_with_context(export_users()),
+                    mimetype="application/x-ndjson")
+
+
 @app_views.route("/users/<user_id>", methods=["PUT"], strict_slashes=False)
 def update_user(user_id: str = None) -> str:
     """PUT /api/v1/users/:id
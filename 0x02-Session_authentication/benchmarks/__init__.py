@@ -0,0 +1,5 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of the API models and authentication, run from the project
+root with `python3 -m benchmarks.<name>`
+"""
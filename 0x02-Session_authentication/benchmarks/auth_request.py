@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Per-request cost of the authentication check in before_request, and
+number of user lookups (current_user calls): the former checks against
+Auth.authenticate
+
+Each check is timed with the request as it comes, so including
+werkzeug's one-off parsing of its headers and cookies, and with them
+already parsed, to isolate the cost of the authentication itself.
+
+Runs BasicAuth with its credential cache disabled, so every
+resolution decodes the header and verifies the password, and
+SessionAuth, in a scratch directory:
+
+    python3 -m benchmarks.auth_request [REQUESTS]
+"""
+import base64
+import gc
+import os
+import sys
+import tempfile
+import time
+from typing import Tuple
+
+os.environ["BASIC_AUTH_CACHE"] = "0"
+os.chdir(tempfile.mkdtemp())
+
+from flask import Flask, request  # noqa: E402
+
+from api.v1.auth.basic_auth import BasicAuth  # noqa: E402
+from api.v1.auth.session_auth import SessionAuth  # noqa: E402
+from models.user import User  # noqa: E402
+
+EMAIL = "bob@example.com"
+PASSWORD = "H0lbertonSchool98!"
+
+
+def former_check(auth) -> object:
+    """ before_request as it was
+    """
+    user = auth.current_user(request)
+    if auth.authorization_header(request) is None and \
+            auth.session_cookie(request) is None:
+        return None
+    if auth.current_user(request) is None:
+        return None
+    return user
+
+
+def new_check(auth) -> object:
+    """ before_request through the memoized context
+    """
+    context = auth.authenticate(request)
+    if context.credentials is None:
+        return None
+    return context.user
+
+
+def per_request(app: Flask, auth, check, requests: int, parsed: bool,
+                **environ) -> Tuple[float, float]:
+    """ Best mean microseconds of `check(auth)` out of 3 runs of
+    `requests` requests, their headers and cookies `parsed` first or
+    not, and the user resolutions per request
+    """
+    current_user = auth.current_user
+    resolutions = 0
+
+    def counting_current_user(request=None):
+        """ auth.current_user, counting its calls
+        """
+        nonlocal resolutions
+        resolutions += 1
+        return current_user(request)
+
+    auth.current_user = counting_current_user
+    best = float("inf")
+    gc.disable()
+    try:
+        for _ in range(3):
+            elapsed = 0.0
+            for _ in range(requests):
+                with app.test_request_context("/api/v1/users/me",
+                                              **environ):
+                    if parsed:
+                        request.headers.get("Authorization")
+                        request.cookies.get(auth.session_name)
+                    started = time.perf_counter()
+                    assert check(auth) is not None
+                    elapsed += time.perf_counter() - started
+            best = min(best, elapsed / requests * 1e6)
+    finally:
+        gc.enable()
+        del auth.current_user
+    return best, resolutions / (3 * requests)
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    app = Flask(__name__)
+    user = User(email=EMAIL)
+    user.password = PASSWORD
+    user.save()
+
+    session_auth = SessionAuth()
+    session_id = session_auth.create_session(user.id)
+    cases = [
+        ("basic_auth", BasicAuth(), {"headers": {
+            "Authorization": "Basic " + base64.b64encode(
+                "{}:{}".format(EMAIL, PASSWORD).encode()).decode()}}),
+        ("session_auth", session_auth, {"headers": {
+            "Cookie": "{}={}".format(session_auth.session_name,
+                                     session_id)}}),
+    ]
+    for parsed in (False, True):
+        print("{:<13} {:>20} {:>20}".format(
+            "parsed" if parsed else "as it comes", "former",
+            "authenticate"))
+        for name, auth, environ in cases:
+            results = [per_request(app, auth, check, requests, parsed,
+                                   **environ)
+                       for check in (former_check, new_check)]
+            print("{:<13} {}".format(name, " ".join(
+                "{:6.2f} us {:3.0f} lookups".format(us, lookups)
+                for us, lookups in results)))
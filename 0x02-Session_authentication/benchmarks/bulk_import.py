@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Time to create N users with one POST /api/v1/users per user, with one
+POST /api/v1/users/import of N NDJSON lines, with the command line
+import in WORKERS processes, then to export them
+
+    python3 -m benchmarks.bulk_import [N] [WORKERS]
+"""
+import os
+import sys
+import tempfile
+import time
+
+os.chdir(tempfile.mkdtemp())
+
+from api.v1.app import app  # noqa: E402
+from models.base import DATA  # noqa: E402
+from models.storage import dumps  # noqa: E402
+from models.user import User  # noqa: E402
+from models.user_bulk import import_users  # noqa: E402
+
+
+def reset():
+    """ Drop every user, in memory and on file
+    """
+    DATA["User"] = {}
+    User.save_to_file()
+    User.load_from_file()
+
+
+def user_json(i: int) -> dict:
+    """ Body of the i-th user
+    """
+    return {"email": "user{}@example.com".format(i), "password": "pwd",
+            "first_name": "First", "last_name": "Last"}
+
+
+def one_by_one(client, n: int) -> float:
+    """ Seconds taken by n POST /api/v1/users
+    """
+    started = time.perf_counter()
+    for i in range(n):
+        assert client.post("/api/v1/users",
+                           json=user_json(i)).status_code == 201
+    return time.perf_counter() - started
+
+
+def bulk(client, n: int) -> float:
+    """ Seconds taken by one POST /api/v1/users/import of n lines
+    """
+    body = "".join(dumps(user_json(i)) + "\n" for i in range(n))
+    started = time.perf_counter()
+    response = client.post("/api/v1/users/import", data=body,
+                           content_type="application/x-ndjson")
+    elapsed = time.perf_counter() - started
+    assert response.get_json()["created"] == n
+    return elapsed
+
+
+def bulk_processes(n: int, workers: int) -> float:
+    """ Seconds taken by the import of n lines in `workers` processes,
+    as python3 -m models.user_bulk import does
+    """
+    lines = [dumps(user_json(i)) for i in range(n)]
+    started = time.perf_counter()
+    created, _ = import_users(lines, workers=workers)
+    elapsed = time.perf_counter() - started
+    assert created == n
+    return elapsed
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    client = app.test_client()
+    print("{} users".format(n))
+    reset()
+    print("  POST /users x N      {:9.1f} ms".format(
+        one_by_one(client, n) * 1000))
+    reset()
+    print("  POST /users/import   {:9.1f} ms".format(bulk(client, n) * 1000))
+    reset()
+    print("  CLI, {} processes     {:9.1f} ms".format(
+        workers, bulk_processes(n, workers) * 1000))
+    started = time.perf_counter()
+    lines = client.get("/api/v1/users/export").get_data().count(b"\n")
+    assert lines == n
+    print("  export               {:9.1f} ms".format(
+        (time.perf_counter() - started) * 1000))
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Stress test of the object registry of models.base: writer threads
+create, update and remove users while reader threads look them up and
+another thread keeps writing snapshots of the file
+
+Reports the errors raised by any thread, the reader latencies, and
+checks that every snapshot was a complete JSON file and that the
+indexes match the objects at the end.
+
+    python3 -m benchmarks.concurrency [SECONDS] [READERS] [WRITERS]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+os.chdir(tempfile.mkdtemp())
+
+from models.base import DATA, SORTED_IDS  # noqa: E402
+from models.user import User  # noqa: E402
+
+INITIAL_USERS = 20000
+
+errors = []
+stopped = threading.Event()
+
+
+def guarded(func):
+    """ Run func in a loop until stopped, recording its exceptions
+    """
+    def run(*args):
+        """ Call func until stopped
+        """
+        while not stopped.is_set():
+            try:
+                func(*args)
+            except Exception:
+                errors.append(traceback.format_exc())
+    return run
+
+
+def write(ids: list, counter: list):
+    """ Create, update or remove a user
+    """
+    action = random.random()
+    if action < 0.4:
+        user = User(email="new{}@example.com".format(random.random()))
+        user.save(persist=False)
+        ids.append(user.id)
+    elif action < 0.8:
+        user = User.get(random.choice(ids))
+        if user is not None:
+            user.email = "changed{}@example.com".format(random.random())
+            user.save(persist=False)
+    else:
+        user = User.get(random.choice(ids))
+        if user is not None:
+            user.remove(persist=False)
+    counter[0] += 1
+
+
+def read(ids: list, latencies: list):
+    """ Time one lookup among get, search by email, all, count and page
+    """
+    action = random.random()
+    started = time.perf_counter()
+    if action < 0.5:
+        User.get(random.choice(ids))
+    elif action < 0.8:
+        User.search({"email": "user{}@example.com".format(
+            random.randrange(INITIAL_USERS))})
+    elif action < 0.85:
+        User.all()
+    elif action < 0.95:
+        User.count()
+    else:
+        User.page(after=random.choice(ids), limit=20)
+    latencies.append(time.perf_counter() - started)
+
+
+def snapshot(counter: list):
+    """ Write the file and check it is a complete JSON object
+    """
+    User.save_to_file()
+    with open(".db_User.json") as f:
+        json.load(f)
+    counter[0] += 1
+
+
+def check_consistency() -> list:
+    """ Differences between the objects and the indexes
+    """
+    problems = []
+    objs = DATA["User"]
+    if SORTED_IDS.get("User") != sorted(objs):
+        problems.append("sorted IDs differ from the objects")
+    for obj in objs.values():
+        if obj not in User.search({"email": obj.email}):
+            problems.append("{} missing from the email index".format(obj.id))
+    return problems
+
+
+def percentile(values: list, p: float) -> float:
+    """ p-th percentile of values, in microseconds
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1e6
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    writers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    for i in range(INITIAL_USERS):
+        User(email="user{}@example.com".format(i)).save(persist=False)
+    ids = list(DATA["User"])
+    User.page(limit=1)
+
+    latencies = [[] for _ in range(readers)]
+    writes = [[0] for _ in range(writers)]
+    snapshots = [0]
+    threads = [threading.Thread(target=guarded(read), args=(ids, lat))
+               for lat in latencies]
+    threads += [threading.Thread(target=guarded(write), args=(ids, count))
+                for count in writes]
+    threads.append(threading.Thread(target=guarded(snapshot),
+                                    args=(snapshots,)))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stopped.set()
+    for thread in threads:
+        thread.join()
+
+    reads = [latency for lat in latencies for latency in lat]
+    print("{} readers, {} writers, {:.0f}s".format(
+        readers, writers, seconds))
+    print("  reads      {:8d}  p50 {:8.1f} us  p99 {:8.1f} us  "
+          "max {:8.1f} us".format(
+              len(reads), percentile(reads, 0.5), percentile(reads, 0.99),
+              max(reads) * 1e6))
+    print("  writes     {:8d}".format(sum(count[0] for count in writes)))
+    print("  snapshots  {:8d}".format(snapshots[0]))
+    print("  errors     {:8d}".format(len(errors)))
+    for error in errors[:3]:
+        print(error)
+    problems = check_consistency()
+    print("  consistent {:>8}".format("yes" if not problems else "no"))
+    for problem in problems[:3]:
+        print("    " + problem)
+    sys.exit(1 if errors or problems else 0)
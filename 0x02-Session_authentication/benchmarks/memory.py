@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Compare the resident size of N users in the previous __dict__ layout
+(with two datetime objects each) and in the __slots__ layout of models
+
+    python3 -m benchmarks.memory [N]
+"""
+from datetime import datetime
+import hashlib
+import sys
+import tracemalloc
+import uuid
+
+from models.user import User
+
+
+class DictUser():
+    """ User laid out like models.user.User before __slots__
+    """
+
+    def __init__(self, email: str, password: str):
+        """ Initialize a DictUser with the attributes of a User
+        """
+        self.id = str(uuid.uuid4())
+        self.created_at = datetime.utcnow()
+        self.updated_at = datetime.utcnow()
+        self.email = email
+        self._password = password
+        self.first_name = None
+        self.last_name = None
+
+
+def measure(factory, n: int) -> int:
+    """ Bytes allocated to keep `n` objects built by `factory` alive
+    """
+    password = hashlib.sha256(b"pwd").hexdigest()
+    tracemalloc.start()
+    objs = {}
+    for i in range(n):
+        obj = factory("user{}@example.com".format(i), password)
+        objs[obj.id] = obj
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+def slotted_user(email: str, password: str) -> User:
+    """ Build a models.user.User
+    """
+    user = User(email=email)
+    user._password = password
+    return user
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    before = measure(DictUser, n)
+    after = measure(slotted_user, n)
+    print("{} users".format(n))
+    print("  __dict__: {:8.1f} MiB ({} B/user)".format(
+        before / 2 ** 20, before // n))
+    print("  __slots__: {:7.1f} MiB ({} B/user)".format(
+        after / 2 ** 20, after // n))
+    print("  saved: {:.0%}".format(1 - after / before))
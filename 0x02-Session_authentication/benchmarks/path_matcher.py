@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Cost of Auth.require_auth with 5 and 500 excluded path rules: the
+former loop over the rules against the PathMatcher trie
+
+    python3 -m benchmarks.path_matcher [CHECKS]
+"""
+import sys
+import time
+
+from api.v1.auth.path_matcher import PathMatcher
+
+PATHS = ["/api/v1/users/me", "/api/v1/status", "/api/v1/stats/",
+         "/api/v1/auth_session/login/", "/api/v1/users/" + "a" * 36]
+
+
+def loop_require_auth(path: str, excluded_paths: list) -> bool:
+    """ Auth.require_auth as it was: one test per rule
+    """
+    if path in excluded_paths:
+        return False
+    for excluded_path in excluded_paths:
+        if excluded_path.endswith("*"):
+            if path.startswith(excluded_path[:-1]):
+                return False
+        elif excluded_path == path or path.startswith(excluded_path + "/"):
+            return False
+    return True
+
+
+def rules(n: int) -> list:
+    """ `n` rules mixing exact, trailing-slash and wildcard ones
+    """
+    base = ["/api/v1/status/", "/api/v1/unauthorized/", "/api/v1/forbidden/",
+            "/api/v1/auth_session/login/", "/api/v1/public*"]
+    kinds = ["/api/v1/x{}/", "/api/v1/x{}", "/api/v1/y{}*"]
+    return base + [kinds[i % 3].format(i) for i in range(n - len(base))]
+
+
+def per_check_us(check, checks: int) -> float:
+    """ Mean microseconds of `check(path)` over `checks` calls
+    """
+    started = time.perf_counter()
+    for i in range(checks):
+        check(PATHS[i % len(PATHS)])
+    return (time.perf_counter() - started) / checks * 1e6
+
+
+if __name__ == "__main__":
+    checks = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    for n in (5, 500):
+        excluded_paths = rules(n)
+        matcher = PathMatcher(excluded_paths)
+        print("{:>4} rules: loop {:7.2f} us   trie {:5.2f} us".format(
+            n, per_check_us(lambda path: loop_require_auth(
+                path, excluded_paths), checks),
+            per_check_us(lambda path: not matcher.match(path), checks)))
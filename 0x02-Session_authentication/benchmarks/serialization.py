@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Cost of serializing N users: repeated to_json calls without and with
+the cached JSON dictionary (sized for the N users), and save_to_file
+with json.dump against models.storage.dumps (orjson when installed)
+
+    python3 -m benchmarks.serialization [N]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+os.chdir(tempfile.mkdtemp())
+
+from models import base, storage  # noqa: E402
+from models.base import Base  # noqa: E402
+from models.user import User  # noqa: E402
+
+
+def uncached_to_json(obj: Base) -> dict:
+    """ to_json without the cache, as it was
+    """
+    object.__setattr__(obj, '_json_cache', None)
+    return {key: value for key, value in obj._serialized().items()
+            if key[0] != '_'}
+
+
+def best_of(func, runs: int = 3) -> float:
+    """ Best wall time (seconds) of `runs` calls of func
+    """
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def json_dump_snapshot(s_class: str, objs_json: dict,
+                       checkpoint: object = None):
+    """ FileStorage.write_snapshot with json.dump
+    """
+    with open(".db_{}.json".format(s_class), 'w') as f:
+        json.dump(objs_json, f)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    base.JSON_CACHE_SIZE = n
+    users = []
+    for i in range(n):
+        user = User(email="user{}@example.com".format(i),
+                    first_name="First", last_name="Last")
+        user.password = "pwd"
+        user.save(persist=False)
+        users.append(user)
+    print("{} users, encoder: {}".format(
+        n, "orjson" if storage.orjson is not None else "json"))
+
+    for name, to_json in (("uncached", uncached_to_json),
+                          ("cached", Base.to_json)):
+        elapsed = best_of(lambda: [to_json(u) for u in users])
+        print("  to_json {:<9} {:8.1f} ms".format(name, elapsed * 1000))
+
+    file_storage = storage.get_storage()
+    write_snapshot = file_storage.write_snapshot
+    for name, writer in (("json.dump", json_dump_snapshot),
+                         ("dumps", write_snapshot)):
+        file_storage.write_snapshot = writer
+        elapsed = best_of(User.save_to_file)
+        print("  save_to_file {:<9} {:8.1f} ms".format(
+            name, elapsed * 1000))
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Compare session lookups in a plain dict, the in-process SessionStore
+and the shared SQLiteSessionStore
+
+    python3 -m benchmarks.session_store [N]
+"""
+import os
+import sys
+import tempfile
+import time
+from uuid import uuid4
+
+from api.v1.auth.session_store import SessionStore, SQLiteSessionStore
+
+
+def bench(name: str, store, keys: list) -> None:
+    """ Print the mean set and get latency of a store over `keys`
+    """
+    started = time.perf_counter()
+    for key in keys:
+        store[key] = "user-id"
+    set_us = (time.perf_counter() - started) / len(keys) * 1e6
+    started = time.perf_counter()
+    for key in keys:
+        store.get(key)
+    get_us = (time.perf_counter() - started) / len(keys) * 1e6
+    print("  {:<20} set {:8.2f} us   get {:8.2f} us".format(
+        name, set_us, get_us))
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    keys = [str(uuid4()) for _ in range(n)]
+    db_dir = "/dev/shm" if os.path.isdir("/dev/shm") \
+        else tempfile.gettempdir()
+    db_path = os.path.join(db_dir, "bench_session_store.db")
+    print("{} sessions".format(n))
+    try:
+        bench("dict", {}, keys)
+        bench("SessionStore", SessionStore(), keys)
+        bench("SQLiteSessionStore", SQLiteSessionStore(db_path), keys)
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
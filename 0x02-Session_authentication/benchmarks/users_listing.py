@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Peak memory, time to first byte and total time of GET /api/v1/users
+with N users: the full array, the streamed array and one page
+
+    python3 -m benchmarks.users_listing [N]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.chdir(tempfile.mkdtemp())
+
+from api.v1.app import app  # noqa: E402
+from models.user import User  # noqa: E402
+
+
+def get(client, url: str):
+    """ Time to first byte, total time (seconds) and size of a GET,
+    reading the body chunk by chunk
+    """
+    started = time.perf_counter()
+    response = client.get(url, buffered=False)
+    first_byte = None
+    size = 0
+    for chunk in response.response:
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)
+    total = time.perf_counter() - started
+    response.close()
+    return first_byte, total, size
+
+
+def peak_memory(client, url: str) -> int:
+    """ Peak traced memory (bytes) of a GET, in a separate run since
+    tracing slows it down
+    """
+    tracemalloc.start()
+    get(client, url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    for i in range(n):
+        user = User(email="user{}@example.com".format(i),
+                    first_name="First", last_name="Last")
+        user.password = "pwd"
+        user.save(persist=False)
+    client = app.test_client()
+    client.get("/api/v1/users?limit=1")
+    print("{} users".format(n))
+    for name, url in (("full array", "/api/v1/users"),
+                      ("stream", "/api/v1/users?stream=1"),
+                      ("page of 100", "/api/v1/users?limit=100")):
+        first_byte, total, size = get(client, url)
+        peak = peak_memory(client, url)
+        print("  {:<12} peak {:7.1f} MiB  first byte {:8.1f} ms  "
+              "total {:8.1f} ms  ({:.1f} MiB)".format(
+                  name, peak / 2 ** 20, first_byte * 1000, total * 1000,
+                  size / 2 ** 20))
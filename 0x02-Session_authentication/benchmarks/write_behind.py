@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Disk writes of a burst of N user creations with the default storage,
+which rewrites the file on every save, and the write-behind storage
+
+    python3 -m benchmarks.write_behind [N]
+"""
+import os
+import sys
+import tempfile
+import time
+
+os.chdir(tempfile.mkdtemp())
+
+from models import base, storage  # noqa: E402
+from models.user import User  # noqa: E402
+
+written = {"snapshots": 0, "bytes": 0}
+encode = storage.dumps
+
+
+def counting_dumps(obj: object) -> str:
+    """ storage.dumps, counting the snapshots and bytes written
+    """
+    data = encode(obj)
+    written["snapshots"] += 1
+    written["bytes"] += len(data)
+    return data
+
+
+def burst(backend: storage.FileStorage, n: int) -> float:
+    """ Seconds taken to create n users and flush them
+    """
+    storage.STORAGE = backend
+    User.load_from_file()
+    for key in written:
+        written[key] = 0
+    started = time.perf_counter()
+    for i in range(n):
+        user = User(email="user{}@example.com".format(i))
+        user.password = "pwd"
+        user.save()
+    base.flush()
+    elapsed = time.perf_counter() - started
+    User.load_from_file()
+    assert User.count() == n
+    os.remove(backend.snapshot_path("User"))
+    return elapsed
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    storage.dumps = counting_dumps
+    print("{} users".format(n))
+    for name, backend in (
+            ("file", storage.FileStorage()),
+            ("write-behind", storage.WriteBehindStorage(flush_interval=0.5,
+                                                        flush_batch=1000))):
+        elapsed = burst(backend, n)
+        print("  {:<13} {:8.1f} ms  {:5d} snapshots  {:8.1f} MiB".format(
+            name, elapsed * 1000, written["snapshots"],
+            written["bytes"] / 2 ** 20))
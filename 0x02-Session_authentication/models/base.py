@@ -1,40 +1,142 @@
 #!/usr/bin/env python3
 """ Base module
 """
-from datetime import datetime
-from typing import TypeVar, List, Iterable
-from os import path
-import json
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from os import getenv
+from typing import TypeVar, List, Iterable, Iterator, Optional, Tuple
+import logging
+import sys
+import threading
+import time
 import uuid
 
+from models.storage import get_storage
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+EPOCH = datetime(1970, 1, 1)
+SLOT_NAMES = {}
 DATA = {}
+PENDING = {}
+INDEXES = {}
+SORTED_IDS = {}
+LOCKS = {}
+SNAPSHOT_LOCKS = {}
+JSON_CACHE_SIZE = int(getenv("JSON_CACHE_SIZE", 10000))
+JSON_CACHED = OrderedDict()
+JSON_CACHE_LOCK = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def parse_timestamp(value: str) -> datetime:
+    """ Parse a TIMESTAMP_FORMAT string, skipping strptime when possible
+    """
+    if len(value) == 19:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+def peak_rss_kib() -> int:
+    """ Peak resident set size of the process in KiB (0 if unknown)
+    """
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak //= 1024
+    return peak
+
+
+def flush():
+    """ Write the changes the storage still holds in memory, such as
+    those of the write-behind storage (STORAGE_TYPE=write_behind)
+    """
+    get_storage().flush()
 
 
 class Base():
     """ Base class
+
+    Instances use __slots__ and keep timestamps as seconds since the
+    epoch; subclasses that don't declare __slots__ get a __dict__ back.
+
+    The JSON dictionary returned by to_json is cached, for the
+    JSON_CACHE_SIZE objects it was most recently built for, until one of
+    their attributes is assigned (in-place changes of mutable attribute
+    values are not tracked). Snapshots and journal records reuse it but
+    don't fill it, so it never holds every object.
+
+    Changes to the registry of a class (save, remove, load_from_file)
+    are serialized by a per-class lock; lookups (get, search, all, count,
+    page) don't take it and read the dicts through atomic operations
+    (get, len, copies), so they never wait on a writer.
+
+    The INDEXED_ATTRIBUTES of a class map each value to the ID of the
+    object holding it, or to a set of IDs if several do. Assigning one of
+    them on a saved object moves it in the index right away, under the
+    lock of the class.
     """
 
+    __slots__ = ("id", "_created_at", "_updated_at", "_json_cache")
+    INDEXED_ATTRIBUTES = ()
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
         s_class = str(self.__class__.__name__)
         if DATA.get(s_class) is None:
-            DATA[s_class] = {}
+            with self.__class__._lock():
+                if DATA.get(s_class) is None:
+                    self.__class__._reset_indexes()
+                    DATA[s_class] = {}
 
         self.id = kwargs.get('id', str(uuid.uuid4()))
         if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+            self.created_at = parse_timestamp(kwargs.get('created_at'))
         else:
             self.created_at = datetime.utcnow()
         if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+            self.updated_at = parse_timestamp(kwargs.get('updated_at'))
         else:
             self.updated_at = datetime.utcnow()
 
+    def __setattr__(self, name: str, value: object):
+        """ Assign an attribute, then drop the cached JSON dictionary
+        (or the claim of a _serialized call building it from the
+        previous value)
+        """
+        if name in self.INDEXED_ATTRIBUTES:
+            self._assign_indexed(name, value)
+        else:
+            object.__setattr__(self, name, value)
+        if getattr(self, '_json_cache', None) is not None:
+            with JSON_CACHE_LOCK:
+                object.__setattr__(self, '_json_cache', None)
+
+    def _assign_indexed(self, name: str, value: object):
+        """ Assign an indexed attribute, moving a saved object from the
+        index entry of the previous value to that of the new one
+        """
+        cls = self.__class__
+        with cls._lock():
+            old_value = getattr(self, name, None)
+            object.__setattr__(self, name, value)
+            obj_id = getattr(self, 'id', None)
+            if DATA.get(cls.__name__, {}).get(obj_id) is self:
+                cls._index_discard(name, old_value, obj_id)
+                cls._index_insert(name, value, obj_id)
+
     def __eq__(self, other: TypeVar('Base')) -> bool:
         """ Equality
         """
@@ -44,69 +146,244 @@ class Base():
             return False
         return (self.id == other.id)
 
-    def to_json(self, for_serialization: bool = False) -> dict:
-        """ Convert the object a JSON dictionary
+    @property
+    def created_at(self) -> datetime:
+        """ Creation date
+        """
+        return EPOCH + timedelta(seconds=self._created_at)
+
+    @created_at.setter
+    def created_at(self, value: datetime):
+        """ Setter of the creation date
         """
+        self._created_at = (value - EPOCH).total_seconds()
+
+    @property
+    def updated_at(self) -> datetime:
+        """ Last update date
+        """
+        return EPOCH + timedelta(seconds=self._updated_at)
+
+    @updated_at.setter
+    def updated_at(self, value: datetime):
+        """ Setter of the last update date
+        """
+        self._updated_at = (value - EPOCH).total_seconds()
+
+    @classmethod
+    def _lock(cls) -> threading.RLock:
+        """ Lock serializing the changes to the objects of the class
+        """
+        lock = LOCKS.get(cls.__name__)
+        if lock is None:
+            lock = LOCKS.setdefault(cls.__name__, threading.RLock())
+        return lock
+
+    @classmethod
+    def _snapshot_lock(cls) -> threading.Lock:
+        """ Lock serializing the writes of the file of the class, so an
+        older snapshot never overwrites a newer one
+        """
+        lock = SNAPSHOT_LOCKS.get(cls.__name__)
+        if lock is None:
+            lock = SNAPSHOT_LOCKS.setdefault(cls.__name__, threading.Lock())
+        return lock
+
+    @classmethod
+    def _slot_names(cls) -> Tuple[str, ...]:
+        """ Slots declared by the subclasses of Base, in definition order
+        """
+        names = SLOT_NAMES.get(cls)
+        if names is None:
+            names = tuple(name for klass in reversed(cls.__mro__[:-2])
+                          for name in klass.__dict__.get('__slots__', ()))
+            SLOT_NAMES[cls] = names
+        return names
+
+    def _attributes(self) -> Iterator[Tuple[str, object]]:
+        """ Iterate over the attributes of the object, slots first
+        """
+        yield 'id', self.id
+        yield 'created_at', self.created_at
+        yield 'updated_at', self.updated_at
+        for key in self._slot_names():
+            if hasattr(self, key):
+                yield key, getattr(self, key)
+        if hasattr(self, '__dict__'):
+            yield from self.__dict__.items()
+
+    def _serialized(self, cache: bool = False) -> dict:
+        """ JSON dictionary of all attributes, not to be modified: the
+        cached one if any, else built and, with `cache`, cached
+        """
+        cached = getattr(self, '_json_cache', None)
+        if type(cached) is dict:
+            return cached
+        claim = None
+        if cache and cached is None:
+            # an assignment while the dictionary is built replaces the
+            # claim, so a dictionary of the previous values isn't cached
+            claim = object()
+            object.__setattr__(self, '_json_cache', claim)
         result = {}
-        for key, value in self.__dict__.items():
-            if not for_serialization and key[0] == '_':
-                continue
+        for key, value in self._attributes():
             if type(value) is datetime:
                 result[key] = value.strftime(TIMESTAMP_FORMAT)
             else:
                 result[key] = value
+        if claim is not None:
+            self._cache_json(claim, result)
         return result
 
+    def _cache_json(self, claim: object, result: dict):
+        """ Cache the JSON dictionary if no attribute was assigned since
+        the claim, evicting that of the least recently cached object
+        once JSON_CACHE_SIZE objects hold one
+        """
+        with JSON_CACHE_LOCK:
+            if getattr(self, '_json_cache', None) is not claim:
+                return
+            object.__setattr__(self, '_json_cache', result)
+            JSON_CACHED[id(self)] = self
+            JSON_CACHED.move_to_end(id(self))
+            while len(JSON_CACHED) > JSON_CACHE_SIZE:
+                _, evicted = JSON_CACHED.popitem(last=False)
+                object.__setattr__(evicted, '_json_cache', None)
+
+    def to_json(self, for_serialization: bool = False) -> dict:
+        """ Convert the object a JSON dictionary
+        """
+        if for_serialization:
+            return dict(self._serialized(cache=True))
+        return {key: value
+                for key, value in self._serialized(cache=True).items()
+                if key[0] != '_'}
+
     @classmethod
-    def load_from_file(cls):
+    def load_from_file(cls, lazy: bool = False):
         """ Load all objects from file
+
+        Objects are streamed from the storage one at a time. With `lazy`,
+        they are kept as JSON dictionaries and only built the first time
+        they are requested.
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
-            return
-
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+        started = time.perf_counter()
+        # before the reset and outside the lock of the class: the storage
+        # may write pending changes first, and takes its own locks
+        stored = get_storage().load(cls)
+        with cls._lock():
+            DATA[s_class] = {}
+            PENDING[s_class] = {}
+            SORTED_IDS.pop(s_class, None)
+            cls._reset_indexes()
+            for obj_id, obj_json in stored:
+                if lazy:
+                    PENDING[s_class][obj_id] = obj_json
+                    cls._index_put(obj_id, obj_json)
+                else:
+                    obj = cls(**obj_json)
+                    DATA[s_class][obj_id] = obj
+                    cls._index_add(obj)
+        logger.info("Loaded %d %s objects%s in %.3fs, peak RSS %d KiB",
+                    cls.count(), s_class, " (lazy)" if lazy else "",
+                    time.perf_counter() - started, peak_rss_kib())
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
+
+        The objects are copied under the lock of the class, then
+        serialized and written without holding it. The storage is told
+        which changes it had persisted before the copy, as those are the
+        only ones the snapshot is sure to hold.
+
+        Locks are always taken in the same order: the snapshot lock of
+        the class, its lock, then the locks of the storage.
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        storage = get_storage()
+        with cls._snapshot_lock():
+            checkpoint = storage.checkpoint(s_class)
+            with cls._lock():
+                objs = DATA[s_class].copy()
+                pending = PENDING.get(s_class, {}).copy()
+            objs_json = {}
+            for obj_id, obj in objs.items():
+                objs_json[obj_id] = obj._serialized()
+            objs_json.update(pending)
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+            storage.write_snapshot(s_class, objs_json, checkpoint)
 
-    def save(self):
+    def save(self, persist: bool = True):
         """ Save current object
+
+        With `persist` False, the object is only saved in memory and
+        written by a later save_to_file
         """
         s_class = self.__class__.__name__
-        self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        with self.__class__._lock():
+            self.updated_at = datetime.utcnow()
+            sorted_ids = SORTED_IDS.get(s_class)
+            if sorted_ids is not None and self.id not in DATA[s_class] \
+                    and self.id not in PENDING.get(s_class, {}):
+                insort(sorted_ids, self.id)
+            previous = DATA[s_class].get(self.id)
+            if previous is None:
+                previous = PENDING.get(s_class, {}).pop(self.id, None)
+            if previous is not self:
+                # a new object, or a new instance replacing the stored
+                # one: an object already saved is kept indexed as its
+                # attributes are assigned
+                if previous is not None:
+                    self.__class__._index_remove(self.id, previous)
+                DATA[s_class][self.id] = self
+                self.__class__._index_add(self)
+        if persist:
+            get_storage().upsert(self.__class__, self)
+
+    @classmethod
+    def save_all(cls, objs: Iterable[TypeVar('Base')], persist: bool = True):
+        """ Save many objects at once: in memory under a single hold of
+        the lock, then persisted together by the storage (one write of
+        the file, of the journal or of the write-behind flusher)
+        """
+        s_class = cls.__name__
+        objs = list(objs)
+        with cls._lock():
+            # cheaper to sort again on the next page() than to insort
+            # each object
+            SORTED_IDS.pop(s_class, None)
+            for obj in objs:
+                obj.save(persist=False)
+        if persist:
+            get_storage().upsert_all(cls, objs)
 
-    def remove(self):
+    def remove(self, persist: bool = True):
         """ Remove object
+
+        With `persist` False, the object is only removed from memory and
+        from the file by a later save_to_file
         """
         s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        with self.__class__._lock():
+            if self.__class__.get(self.id) is None:
+                return
+            stored = DATA[s_class].pop(self.id)
+            self.__class__._index_remove(self.id, stored)
+            sorted_ids = SORTED_IDS.get(s_class, ())
+            i = bisect_left(sorted_ids, self.id)
+            if i < len(sorted_ids) and sorted_ids[i] == self.id:
+                del sorted_ids[i]
+        if persist:
+            get_storage().delete(self.__class__, self.id)
 
     @classmethod
     def count(cls) -> int:
         """ Count all objects
         """
         s_class = cls.__name__
-        return len(DATA[s_class].keys())
+        return len(DATA[s_class]) + len(PENDING.get(s_class, {}))
 
     @classmethod
     def all(cls) -> Iterable[TypeVar('Base')]:
@@ -114,18 +391,162 @@ class Base():
         """
         return cls.search()
 
+    @classmethod
+    def page(cls, after: Optional[str] = None,
+             limit: int = 100) -> List[TypeVar('Base')]:
+        """ Return up to `limit` objects in ID order, starting after the
+        ID `after` (from the first one if None)
+        """
+        s_class = cls.__name__
+        sorted_ids = SORTED_IDS.get(s_class)
+        if sorted_ids is None:
+            with cls._lock():
+                sorted_ids = SORTED_IDS.get(s_class)
+                if sorted_ids is None:
+                    sorted_ids = sorted(DATA[s_class].keys() |
+                                        PENDING.get(s_class, {}).keys())
+                    SORTED_IDS[s_class] = sorted_ids
+        start = bisect_right(sorted_ids, after) if after is not None else 0
+        objs = (cls.get(obj_id) for obj_id in
+                sorted_ids[start:start + limit])
+        return [obj for obj in objs if obj is not None]
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
         """
         s_class = cls.__name__
-        return DATA[s_class].get(id)
+        obj = DATA[s_class].get(id)
+        if obj is None and PENDING.get(s_class):
+            obj = cls._materialize(id)
+        return obj
+
+    @classmethod
+    def _materialize(cls, obj_id: str) -> TypeVar('Base'):
+        """ Build a lazily loaded object and move it into DATA
+        """
+        s_class = cls.__name__
+        with cls._lock():
+            obj = DATA[s_class].get(obj_id)
+            if obj is not None:
+                return obj
+            obj_json = PENDING[s_class].get(obj_id)
+            if obj_json is None:
+                return None
+            obj = cls(**obj_json)
+            DATA[s_class][obj_id] = obj
+            del PENDING[s_class][obj_id]
+            return obj
+
+    @classmethod
+    def _materialize_all(cls):
+        """ Build every lazily loaded object of the class
+        """
+        s_class = cls.__name__
+        for obj_id in list(PENDING.get(s_class, {})):
+            cls._materialize(obj_id)
+
+    @classmethod
+    def _reset_indexes(cls):
+        """ Drop all indexes of the class
+        """
+        s_class = cls.__name__
+        INDEXES[s_class] = {k: {} for k in cls.INDEXED_ATTRIBUTES}
+
+    @classmethod
+    def _index_insert(cls, key: str, value: object, obj_id: str):
+        """ Add an object ID to the entry of a value in an index; the
+        lock of the class must be held
+        """
+        index = INDEXES[cls.__name__][key]
+        try:
+            ids = index.get(value)
+        except TypeError:
+            return
+        if ids is None:
+            index[value] = obj_id
+        elif type(ids) is set:
+            ids.add(obj_id)
+        elif ids != obj_id:
+            index[value] = {ids, obj_id}
+
+    @classmethod
+    def _index_discard(cls, key: str, value: object, obj_id: str):
+        """ Remove an object ID from the entry of a value in an index;
+        the lock of the class must be held
+        """
+        index = INDEXES[cls.__name__][key]
+        try:
+            ids = index.get(value)
+        except TypeError:
+            return
+        if ids == obj_id:
+            del index[value]
+        elif type(ids) is set:
+            ids.discard(obj_id)
+            if len(ids) == 1:
+                index[value] = next(iter(ids))
+
+    @classmethod
+    def _index_remove(cls, obj_id: str, stored: object):
+        """ Remove an object ID from all indexes of the class, with the
+        values of the stored object (or JSON dictionary) it was indexed
+        with
+        """
+        if type(stored) is dict:
+            values = stored
+        else:
+            values = {key: getattr(stored, key, None)
+                      for key in cls.INDEXED_ATTRIBUTES}
+        for key in cls.INDEXED_ATTRIBUTES:
+            cls._index_discard(key, values.get(key), obj_id)
+
+    @classmethod
+    def _index_put(cls, obj_id: str, attributes: dict):
+        """ Index an object ID with its attribute values
+        """
+        if cls.__name__ not in INDEXES:
+            cls._reset_indexes()
+        for key in cls.INDEXED_ATTRIBUTES:
+            cls._index_insert(key, attributes.get(key), obj_id)
+
+    @classmethod
+    def _index_add(cls, obj: TypeVar('Base')):
+        """ Index an object on all indexed attributes of the class
+        """
+        cls._index_put(obj.id, {key: getattr(obj, key, None)
+                                for key in cls.INDEXED_ATTRIBUTES})
+
+    @classmethod
+    def _candidates(cls, attributes: dict) -> Iterable[TypeVar('Base')]:
+        """ Return the smallest set of objects that can match attributes,
+        using indexes when an indexed attribute is part of the query
+        """
+        s_class = cls.__name__
+        indexes = INDEXES.get(s_class, {})
+        candidates = None
+        for key, value in attributes.items():
+            if key not in indexes:
+                continue
+            try:
+                ids = indexes[key].get(value, ())
+            except TypeError:
+                continue
+            if type(ids) is str:
+                ids = (ids,)
+            if candidates is None or len(ids) < len(candidates):
+                candidates = ids
+        if candidates is None:
+            if PENDING.get(s_class):
+                cls._materialize_all()
+            return list(DATA[s_class].values())
+        objs = (cls.get(obj_id) for obj_id in list(candidates))
+        return [obj for obj in objs if obj is not None]
 
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
         """
-        s_class = cls.__name__
         def _search(obj):
             if len(attributes) == 0:
                 return True
@@ -133,5 +554,5 @@ class Base():
                 if (getattr(obj, k) != v):
                     return False
             return True
-        
-        return list(filter(_search, DATA[s_class].values()))
+
+        return list(filter(_search, cls._candidates(attributes)))
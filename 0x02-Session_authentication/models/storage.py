@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+""" Storage backends used by models.base to persist objects
+"""
+from os import getenv, path
+from typing import (Dict, Iterator, List, Optional, TextIO, Tuple,
+                    TypeVar)
+import atexit
+import json
+import logging
+import os
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+_ENCODER = json.JSONEncoder(check_circular=False, separators=(",", ":"))
+
+
+def dumps(obj: object) -> str:
+    """ Encode to compact JSON, with orjson when it is installed
+    """
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return _ENCODER.encode(obj)
+
+
+def iter_json_items(f: TextIO,
+                    chunk_size: int = 1 << 16) -> Iterator[Tuple[str, dict]]:
+    """ Stream the (key, value) pairs of a top-level JSON object
+    without holding more than one value and one chunk in memory
+    """
+    decoder = json.JSONDecoder()
+    buf, pos = "", 0
+
+    def peek() -> str:
+        """ Skip whitespace and return the next character ("" at EOF)
+        """
+        nonlocal buf, pos
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            buf, pos = f.read(chunk_size), 0
+            if not buf:
+                return ""
+
+    def take() -> str:
+        """ Consume and return the next non-whitespace character
+        """
+        nonlocal pos
+        c = peek()
+        pos += len(c)
+        return c
+
+    def decode():
+        """ Decode the next JSON value, reading more chunks as needed
+        """
+        nonlocal buf, pos
+        peek()
+        while True:
+            try:
+                value, pos = decoder.raw_decode(buf, pos)
+                return value
+            except ValueError:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise
+                buf, pos = buf[pos:] + chunk, 0
+
+    if take() != "{":
+        raise ValueError("Expected a JSON object")
+    if peek() == "}":
+        return
+    while True:
+        key = decode()
+        if take() != ":":
+            raise ValueError("Expected ':' after key {}".format(key))
+        yield key, decode()
+        c = take()
+        if c == "}":
+            return
+        if c != ",":
+            raise ValueError("Expected ',' or '}}' after key {}".format(key))
+
+
+class FileStorage():
+    """ Rewrite the whole `.db_<Class>.json` file on every change
+
+    The file is written to a temporary file renamed over it, so it is
+    never seen half written; it is fsynced first if `fsync` is set.
+    """
+
+    fsync = False
+
+    def snapshot_path(self, s_class: str) -> str:
+        """ Path of the JSON file holding all objects of a class
+        """
+        return ".db_{}.json".format(s_class)
+
+    def load(self, cls) -> Iterator[Tuple[str, dict]]:
+        """ Stream the (ID, JSON dictionary) of all stored objects
+        """
+        file_path = self.snapshot_path(cls.__name__)
+        if not path.exists(file_path):
+            return
+        with open(file_path, 'r', encoding='utf-8') as f:
+            yield from iter_json_items(f)
+
+    def checkpoint(self, s_class: str) -> object:
+        """ Mark the changes persisted so far, before the objects of a
+        snapshot are copied (nothing to mark: the file is the snapshot)
+        """
+        return None
+
+    def _write_tmp(self, s_class: str, objs_json: Dict[str, dict]) -> str:
+        """ Write a snapshot next to the file of a class and return the
+        temporary path
+        """
+        tmp_path = "{}.{}.tmp".format(self.snapshot_path(s_class),
+                                      os.getpid())
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(dumps(objs_json))
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        return tmp_path
+
+    def write_snapshot(self, s_class: str, objs_json: Dict[str, dict],
+                       checkpoint: object = None):
+        """ Atomically replace the stored objects of a class
+        """
+        tmp_path = self._write_tmp(s_class, objs_json)
+        os.replace(tmp_path, self.snapshot_path(s_class))
+
+    def upsert(self, cls, obj: TypeVar('Base')):
+        """ Persist a created or updated object
+        """
+        cls.save_to_file()
+
+    def upsert_all(self, cls, objs: List[TypeVar('Base')]):
+        """ Persist created or updated objects at once
+        """
+        cls.save_to_file()
+
+    def delete(self, cls, obj_id: str):
+        """ Persist the removal of an object
+        """
+        cls.save_to_file()
+
+    def flush(self):
+        """ Write the changes not persisted yet (none: every change is
+        written right away)
+        """
+
+
+class JournalStorage(FileStorage):
+    """ Append upserts and deletes to `.db_<Class>.journal` and
+    periodically compact the journal into the JSON snapshot
+
+    - the journal is fsynced every `fsync_batch` records or every
+      `fsync_interval` seconds, whichever comes first
+    - once a journal holds `compact_threshold` records, a background
+      thread rewrites the snapshot and truncates the journal
+    - the thread starts with the first record, once per process since
+      threads don't survive a fork
+    """
+
+    def __init__(self, fsync_batch: int = 64, fsync_interval: float = 1.0,
+                 compact_threshold: int = 10000):
+        """ Initialize the journal storage
+        """
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._journals = {}
+        self._pending = {}
+        self._records = {}
+        self._classes = {}
+        self._stopped = threading.Event()
+        self._worker_pid = None
+
+    def journal_path(self, s_class: str) -> str:
+        """ Path of the journal file of a class
+        """
+        return ".db_{}.journal".format(s_class)
+
+    def load(self, cls) -> Iterator[Tuple[str, dict]]:
+        """ Stream the snapshot with the journal replayed on top of it
+
+        Only the journal (bounded by compaction) is read up front: the
+        latest record of each ID, None meaning deleted. This is done,
+        and the snapshot opened, under the journal lock when load is
+        called, so the iteration takes no lock and the snapshot matches
+        the journal even if a compaction replaces them meanwhile.
+        """
+        s_class = cls.__name__
+        latest = {}
+        records = 0
+        snapshot = None
+        with self._lock:
+            file_path = self.journal_path(s_class)
+            if path.exists(file_path):
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            # torn write from a crash: later records,
+                            # appended after a restart, are still valid
+                            continue
+                        if entry.get("op") == "delete":
+                            latest[entry.get("id")] = None
+                        else:
+                            latest[entry.get("id")] = entry.get("obj")
+                        records += 1
+            self._records[s_class] = records
+            self._classes[s_class] = cls
+            if path.exists(self.snapshot_path(s_class)):
+                snapshot = open(self.snapshot_path(s_class), 'r',
+                                encoding='utf-8')
+        return self._replay(snapshot, latest)
+
+    @staticmethod
+    def _replay(snapshot: Optional[TextIO],
+                latest: Dict[str, Optional[dict]]) -> Iterator[
+                    Tuple[str, dict]]:
+        """ Stream the objects of an open snapshot, replacing or
+        skipping those with a journal record, then the journaled ones
+        """
+        if snapshot is not None:
+            with snapshot:
+                for obj_id, obj_json in iter_json_items(snapshot):
+                    if obj_id in latest:
+                        obj_json = latest.pop(obj_id)
+                        if obj_json is None:
+                            continue
+                    yield obj_id, obj_json
+        for obj_id, obj_json in latest.items():
+            if obj_json is not None:
+                yield obj_id, obj_json
+
+    def _append(self, cls, entries: List[dict], fsync: bool = False):
+        """ Append entries to the journal of a class, in one write, and
+        fsync it if `fsync` or once `fsync_batch` records are pending
+        """
+        s_class = cls.__name__
+        lines = "".join(dumps(entry) + "\n" for entry in entries)
+        with self._lock:
+            self._classes[s_class] = cls
+            f = self._journals.get(s_class)
+            if f is None:
+                f = self._open_journal(s_class)
+                self._journals[s_class] = f
+            f.write(lines)
+            f.flush()
+            self._pending[s_class] = \
+                self._pending.get(s_class, 0) + len(entries)
+            self._records[s_class] = \
+                self._records.get(s_class, 0) + len(entries)
+            if fsync or self._pending[s_class] >= self.fsync_batch:
+                self._fsync(s_class)
+        if self._worker_pid != os.getpid():
+            self._start_worker()
+
+    def _open_journal(self, s_class: str) -> TextIO:
+        """ Open the journal of a class for appending, ending a line
+        torn by a crash first so the next record starts on its own line
+        """
+        file_path = self.journal_path(s_class)
+        torn = False
+        if path.exists(file_path) and path.getsize(file_path):
+            with open(file_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+        f = open(file_path, 'a', encoding='utf-8')
+        if torn:
+            f.write("\n")
+        return f
+
+    def _start_worker(self):
+        """ Start the background thread, once per process
+        """
+        with self._lock:
+            if self._worker_pid == os.getpid():
+                return
+            self._worker_pid = os.getpid()
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def _fsync(self, s_class: str):
+        """ Force the journal of a class to disk
+        """
+        f = self._journals.get(s_class)
+        if f is not None and self._pending.get(s_class):
+            os.fsync(f.fileno())
+        self._pending[s_class] = 0
+
+    def upsert(self, cls, obj: TypeVar('Base')):
+        """ Journal a created or updated object
+        """
+        self._append(cls, [{"op": "upsert", "id": obj.id,
+                            "obj": obj._serialized()}])
+
+    def upsert_all(self, cls, objs: List[TypeVar('Base')]):
+        """ Journal created or updated objects, with a single write and
+        fsync
+        """
+        self._append(cls, [{"op": "upsert", "id": obj.id,
+                            "obj": obj._serialized()} for obj in objs],
+                     fsync=True)
+
+    def delete(self, cls, obj_id: str):
+        """ Journal the removal of an object
+        """
+        self._append(cls, [{"op": "delete", "id": obj_id}])
+
+    def checkpoint(self, s_class: str) -> Tuple[int, int]:
+        """ Size (bytes) and number of records of the journal of a class:
+        the records written so far are all in a snapshot of objects
+        copied afterwards
+        """
+        with self._lock:
+            f = self._journals.get(s_class)
+            if f is not None:
+                f.flush()
+            file_path = self.journal_path(s_class)
+            size = path.getsize(file_path) if path.exists(file_path) else 0
+            return size, self._records.get(s_class, 0)
+
+    def write_snapshot(self, s_class: str, objs_json: Dict[str, dict],
+                       checkpoint: Optional[Tuple[int, int]] = None):
+        """ Atomically replace the snapshot and drop the journal records
+        written before `checkpoint` (all of them if None); later ones are
+        kept, since the snapshot may miss them
+        """
+        tmp_path = self._write_tmp(s_class, objs_json)
+        with self._lock:
+            os.replace(tmp_path, self.snapshot_path(s_class))
+            f = self._journals.pop(s_class, None)
+            if f is not None:
+                f.close()
+            file_path = self.journal_path(s_class)
+            offset, records = checkpoint or (0, None)
+            tail = b""
+            if records is not None and path.exists(file_path):
+                with open(file_path, 'rb') as f:
+                    f.seek(offset)
+                    tail = f.read()
+            with open(file_path + ".tmp", 'wb') as f:
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(file_path + ".tmp", file_path)
+            self._pending[s_class] = 0
+            if records is None:
+                self._records[s_class] = 0
+            else:
+                self._records[s_class] = max(
+                    self._records.get(s_class, 0) - records, 0)
+
+    def sync(self):
+        """ Fsync every journal with pending records
+        """
+        with self._lock:
+            for s_class in list(self._journals):
+                self._fsync(s_class)
+
+    def flush(self):
+        """ Fsync every journal with pending records
+        """
+        self.sync()
+
+    def compact(self, force: bool = False):
+        """ Fold journals over the threshold (or all if `force`)
+        into their snapshot
+
+        save_to_file is called without holding the journal lock, which
+        it takes after the locks of the class.
+        """
+        with self._lock:
+            classes = [cls for s_class, cls in self._classes.items()
+                       if self._records.get(s_class, 0) and
+                       (force or self._records[s_class] >=
+                        self.compact_threshold)]
+        for cls in classes:
+            cls.save_to_file()
+
+    def close(self):
+        """ Stop the background thread and fsync pending records
+        """
+        self._stopped.set()
+        self.sync()
+
+    def _run(self):
+        """ Background loop: fsync pending records and compact journals
+        """
+        while not self._stopped.wait(self.fsync_interval):
+            try:
+                self.sync()
+                self.compact()
+            except Exception:
+                logger.exception("Journal sync or compaction failed")
+
+
+class WriteBehindStorage(FileStorage):
+    """ Apply changes in memory and rewrite the snapshots of the changed
+    classes from a background thread
+
+    - a change marks its class dirty; dirty classes are written every
+      `flush_interval` seconds, or as soon as `flush_batch` changes are
+      pending
+    - snapshots are fsynced before replacing the old ones
+    - flush() writes the pending changes right away, close() at exit
+    """
+
+    fsync = True
+
+    def __init__(self, flush_interval: float = 0.5, flush_batch: int = 1000):
+        """ Initialize the write-behind storage
+        """
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.flushes = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._dirty = {}
+        self._changes = 0
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._flusher_pid = None
+
+    def load(self, cls) -> Iterator[Tuple[str, dict]]:
+        """ Stream the (ID, JSON dictionary) of all stored objects, once
+        the pending changes of the class are written
+        """
+        if cls.__name__ in self._dirty:
+            self.flush()
+        return super().load(cls)
+
+    def _changed(self, cls, changes: int = 1):
+        """ Mark the class of created, updated or removed objects dirty
+        """
+        with self._lock:
+            self._dirty[cls.__name__] = cls
+            self._changes += changes
+            if self._changes >= self.flush_batch:
+                self._wake.set()
+        if self._flusher_pid != os.getpid():
+            self._start_flusher()
+
+    def upsert(self, cls, obj: TypeVar('Base')):
+        """ Schedule the write of a created or updated object
+        """
+        self._changed(cls)
+
+    def upsert_all(self, cls, objs: List[TypeVar('Base')]):
+        """ Schedule the write of created or updated objects
+        """
+        self._changed(cls, len(objs))
+
+    def delete(self, cls, obj_id: str):
+        """ Schedule the write of the removal of an object
+        """
+        self._changed(cls)
+
+    def flush(self):
+        """ Write the snapshots of the dirty classes
+        """
+        with self._write_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+                self._changes = 0
+            for s_class, cls in dirty.items():
+                try:
+                    cls.save_to_file()
+                except Exception:
+                    with self._lock:
+                        self._dirty.setdefault(s_class, cls)
+                    raise
+            if dirty:
+                self.flushes += 1
+
+    def close(self):
+        """ Stop the background thread and write the pending changes
+        """
+        self._stopped.set()
+        self._wake.set()
+        self.flush()
+
+    def _start_flusher(self):
+        """ Start the background thread, once per process since threads
+        don't survive a fork
+        """
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        """ Background loop: write the dirty classes
+        """
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Write-behind flush failed")
+
+
+STORAGE = None
+
+
+def get_storage() -> FileStorage:
+    """ Return the storage backend selected by STORAGE_TYPE
+    """
+    global STORAGE
+    if STORAGE is None:
+        if getenv("STORAGE_TYPE") == "journal":
+            STORAGE = JournalStorage(
+                fsync_batch=int(getenv("JOURNAL_FSYNC_BATCH", 64)),
+                compact_threshold=int(getenv("JOURNAL_COMPACT_THRESHOLD",
+                                             10000)))
+            atexit.register(STORAGE.close)
+        elif getenv("STORAGE_TYPE") == "write_behind":
+            STORAGE = WriteBehindStorage(
+                flush_interval=int(getenv("WRITE_BEHIND_INTERVAL_MS",
+                                          500)) / 1000,
+                flush_batch=int(getenv("WRITE_BEHIND_BATCH", 1000)))
+            atexit.register(STORAGE.close)
+        else:
+            STORAGE = FileStorage()
+    return STORAGE
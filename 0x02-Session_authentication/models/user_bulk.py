@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+""" Bulk import and export of users as NDJSON (one JSON object per line)
+
+    python3 -m models.user_bulk import [FILE]
+    python3 -m models.user_bulk export [FILE]
+
+FILE defaults to the standard input/output. Imported lines hold the
+fields of POST /api/v1/users: email, password, first_name and
+last_name (both optional).
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count, islice
+from os import getenv
+from typing import BinaryIO, Iterable, Iterator, List, Tuple, Union
+import json
+import sys
+
+from models.storage import dumps
+from models.user import User, hash_password
+
+IMPORT_CHUNK = 1000
+EXPORT_BATCH = 1000
+
+Line = Union[str, bytes]
+
+
+def prepare_rows(first_line: int,
+                 lines: List[Line]) -> List[Tuple[int, dict, str]]:
+    """ Parse, validate and hash the password of a chunk of lines
+
+    Return a (line number, User keyword arguments, None) or a
+    (line number, None, error) tuple per non-blank line.
+    """
+    rows = []
+    for line_no, line in enumerate(lines, first_line):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            rows.append((line_no, None, "invalid JSON"))
+            continue
+        if not isinstance(row, dict):
+            rows.append((line_no, None, "not a JSON object"))
+            continue
+        email = row.get("email")
+        password = row.get("password")
+        error = None
+        if not email or type(email) is not str:
+            error = "email missing"
+        elif not password or type(password) is not str:
+            error = "password missing"
+        elif any(row.get(key) is not None and type(row.get(key)) is not str
+                 for key in ("first_name", "last_name")):
+            error = "first_name and last_name must be strings"
+        if error is not None:
+            rows.append((line_no, None, error))
+            continue
+        rows.append((line_no, {
+            "email": email,
+            "_password": hash_password(password),
+            "first_name": row.get("first_name"),
+            "last_name": row.get("last_name"),
+        }, None))
+    return rows
+
+
+def iter_lines(stream: BinaryIO,
+               chunk_size: int = 1 << 16) -> Iterator[bytes]:
+    """ Yield the lines of a binary stream, reading it by chunks rather
+    than line by line
+    """
+    rest = b""
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        yield from lines
+    if rest:
+        yield rest
+
+
+def _chunks(lines: Iterable[Line]) -> Iterator[Tuple[int, List[Line]]]:
+    """ Split lines into (first line number, IMPORT_CHUNK lines) chunks
+    """
+    lines = iter(lines)
+    for first_line in count(1, IMPORT_CHUNK):
+        chunk = list(islice(lines, IMPORT_CHUNK))
+        if not chunk:
+            return
+        yield first_line, chunk
+
+
+def _prepared(lines: Iterable[Line],
+              workers: int) -> Iterator[List[Tuple[int, dict, str]]]:
+    """ Yield the prepare_rows() of each chunk of lines, in order
+
+    Chunks are read as they are needed: with more than one worker
+    process, at most 2 chunks per worker are in flight at a time.
+    """
+    chunks = _chunks(lines)
+    if workers <= 1:
+        for first_line, chunk in chunks:
+            yield prepare_rows(first_line, chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for first_line, chunk in chunks:
+            pending.append(executor.submit(prepare_rows, first_line, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def import_users(lines: Iterable[Line],
+                 workers: int = 1) -> Tuple[int, List[dict]]:
+    """ Create the users of NDJSON lines
+
+    Lines are read, parsed, validated and hashed by chunks, in the
+    calling thread or, with more than one of `workers`, in a pool of
+    processes: only meant for the command line, not for a request of
+    the API. Valid users whose email is not taken are then saved at
+    once, with a single write of the storage.
+
+    Return the number of created users and the errors, as
+    {"line": line number, "error": message} dictionaries.
+    """
+    users = []
+    errors = []
+    emails = set()
+    for rows in _prepared(lines, workers):
+        for line_no, user_kwargs, error in rows:
+            if error is None:
+                email = user_kwargs["email"]
+                if email in emails or User.search({"email": email}):
+                    error = "email already exists"
+            if error is not None:
+                errors.append({"line": line_no, "error": error})
+                continue
+            emails.add(email)
+            users.append(User(**user_kwargs))
+    if users:
+        User.save_all(users)
+    return len(users), errors
+
+
+def import_workers() -> int:
+    """ Number of processes of a command line import, from
+    BULK_IMPORT_WORKERS
+    """
+    try:
+        return max(int(getenv("BULK_IMPORT_WORKERS", 1)), 1)
+    except ValueError:
+        return 1
+
+
+def export_users() -> Iterator[str]:
+    """ Yield the NDJSON lines of all users in ID order, by chunks of
+    EXPORT_BATCH users
+    """
+    after = None
+    while True:
+        users = User.page(after=after, limit=EXPORT_BATCH)
+        if not users:
+            return
+        yield "".join(dumps(user.to_json()) + "\n" for user in users)
+        after = users[-1].id
+
+
+if __name__ == "__main__":
+    usage = "usage: python3 -m models.user_bulk import|export [FILE]"
+    if len(sys.argv) not in (2, 3) or \
+            sys.argv[1] not in ("import", "export"):
+        sys.exit(usage)
+    User.load_from_file()
+    path = sys.argv[2] if len(sys.argv) == 3 else None
+    if sys.argv[1] == "export":
+        out = open(path, "w", encoding="utf-8") if path else sys.stdout
+        for chunk in export_users():
+            out.write(chunk)
+        out.flush()
+        sys.exit(0)
+    source = open(path, "rb") if path else sys.stdin.buffer
+    created, errors = import_users(source, workers=import_workers())
+    for error in errors:
+        print("line {}: {}".format(error["line"], error["error"]),
+              file=sys.stderr)
+    print("{} users imported, {} errors".format(created, len(errors)))
+    sys.exit(1 if errors else 0)
@@ -12,6 +12,9 @@ class UserSession(Base):
     Implement session model.
     """
 
+    __slots__ = ("user_id", "session_id")
+    INDEXED_ATTRIBUTES = ("session_id", "user_id")
+
     def __init__(self, user_id: str, session_id:
                  str, *args: list, **kwargs: dict):
         """Initialize user session object."""
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+""" Tests of the journal storage
+
+    python3 -m unittest discover tests
+"""
+import os
+import tempfile
+import unittest
+
+from models import base, storage
+from models.user import User
+
+
+class TestJournalRecovery(unittest.TestCase):
+    """ Records journaled after a crash survive the torn line it left
+    """
+
+    def setUp(self):
+        """ Journal storage in an empty directory
+        """
+        self.cwd = os.getcwd()
+        os.chdir(tempfile.mkdtemp())
+        self.previous = storage.STORAGE
+        storage.STORAGE = storage.JournalStorage(fsync_batch=1)
+        base.DATA["User"] = {}
+
+    def tearDown(self):
+        """ Restore the storage and the directory
+        """
+        storage.STORAGE = self.previous
+        base.DATA.pop("User", None)
+        os.chdir(self.cwd)
+
+    def save_users(self, start: int, n: int):
+        """ Create and journal n users
+        """
+        for i in range(start, start + n):
+            User(email="user{}@example.com".format(i)).save()
+
+    def restart(self):
+        """ Reload as a new process would, with a new storage
+        """
+        storage.STORAGE = storage.JournalStorage(fsync_batch=1)
+        User.load_from_file()
+
+    def test_append_after_torn_line(self):
+        """ A crash in the middle of a record loses only that record
+        """
+        User.load_from_file()
+        self.save_users(0, 3)
+        with open(storage.STORAGE.journal_path("User"), 'a') as f:
+            f.write('{"op":"upsert","id":"torn","obj":{"ema')
+        self.restart()
+        self.assertEqual(User.count(), 3)
+        self.save_users(3, 3)
+        self.restart()
+        self.assertEqual(User.count(), 6)
+        self.assertEqual(len(User.search({"email": "user5@example.com"})), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,11 +3,13 @@
 Basic Flask App
 """
 
+import logging
 import os
 from typing import Tuple
 from flask import Flask, abort, jsonify, request, redirect
 from flask_cors import CORS
 from auth import Auth
+from hashing import HashingPoolBusy
 import utils
 from werkzeug import Response
 
@@ -15,6 +17,25 @@ app = Flask(__name__)
 AUTH = Auth()
 
 
+@app.teardown_appcontext
+def close_db_session(_) -> None:
+    """
+    Release the database session of the request thread.
+    """
+    AUTH._db.close_session()
+
+
+@app.errorhandler(HashingPoolBusy)
+def hashing_pool_busy(_) -> Tuple[Response, int]:
+    """
+    Handle a full password hashing pool.
+
+    Returns:
+        Tuple[Response, int]: A JSON error and 503 Service Unavailable.
+    """
+    return jsonify({"message": "server busy, retry later"}), 503
+
+
 @app.route("/", methods=["GET"], strict_slashes=False)
 def index():
     """
@@ -169,4 +190,6 @@ def update_password() -> str:
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    app.logger.info("Password hashing: %s", AUTH._hashing.describe())
     app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+ASGI twin of app.py, on Quart
+
+Serves the same routes with coroutines, so idle or slow clients cost
+a task instead of a thread:
+
+    uvicorn app_async:app --port 5000
+"""
+
+import logging
+from typing import Tuple
+from quart import Quart, abort, jsonify, request, redirect
+from auth_async import AsyncAuth
+from hashing import HashingPoolBusy
+import utils
+from werkzeug import Response
+
+app = Quart(__name__)
+AUTH = AsyncAuth()
+
+
+@app.before_serving
+async def migrate_db() -> None:
+    """
+    Create or migrate the schema before accepting requests.
+    """
+    await AUTH._db.migrate()
+
+
+@app.after_serving
+async def close_db() -> None:
+    """
+    Close the database connections on shutdown.
+    """
+    await AUTH._db.close()
+
+
+@app.errorhandler(HashingPoolBusy)
+async def hashing_pool_busy(_) -> Tuple[Response, int]:
+    """
+    Handle a full password hashing pool.
+
+    Returns:
+        Tuple[Response, int]: A JSON error and 503 Service Unavailable.
+    """
+    return jsonify({"message": "server busy, retry later"}), 503
+
+
+@app.route("/", methods=["GET"], strict_slashes=False)
+async def index():
+    """
+    Handle GET requests to the root URL.
+
+    Returns:
+        Response: A JSON response with a welcome message.
+    """
+    return jsonify({"message": "Bienvenue"})
+
+
+@app.route("/users", methods=["POST"], strict_slashes=False)
+async def users() -> Tuple[Response, int]:
+    """
+    Handle POST requests to the /users endpoint to register a new user.
+
+    Returns:
+        Tuple[jsonify, int]: A tuple containing the JSON response and
+        the HTTP status code.
+    """
+    form = await request.form
+    email = form.get("email")
+    password = form.get("password")
+
+    # Validate input
+    if not email or not password:
+        return jsonify({"message": "email and password are required"}), 400
+
+    try:
+        user = await AUTH.register_user(email, password)
+        return jsonify({"email": user.email, "message": "user created"}), 200
+    except ValueError:
+        return jsonify({"message": "email already registered"}), 400
+
+
+@app.route("/sessions", methods=["POST"], strict_slashes=False)
+async def login() -> Tuple[Response, int]:
+    """
+    Handle POST requests to the /sessions endpoint to log in a user.
+
+    Returns:
+        Tuple[jsonify, int]: A tuple containing the JSON response and
+        the HTTP status code.
+    """
+    form = await request.form
+    response, error_msgs = utils.request_body_provided(
+        expected_fields={"email": str, "password": str}, form=form
+    )
+    if not response:
+        return jsonify({"message": error_msgs}), 400
+
+    email = form.get("email")
+    password = form.get("password")
+
+    if not await AUTH.valid_login(email=email, password=password):
+        abort(401)
+
+    session_id = await AUTH.create_session(email=email)
+    response = jsonify({"email": email, "message": "logged in"})
+    response.set_cookie(key="session_id", value=session_id)
+    return response, 200
+
+
+@app.route("/sessions", methods=["DELETE"], strict_slashes=False)
+async def logout() -> Tuple[Response, int]:
+    """
+    DELETES requests to the /sessions endpoint to log out a user.
+
+    Returns:
+        Tuple[Response, int]: A tuple containing the response
+        & HTTP status code.
+    """
+    session_id = request.cookies.get("session_id")
+    user = await AUTH.get_user_from_session_id(session_id)
+
+    if not user:
+        return jsonify({"message": "Invalid session ID"}), 403
+
+    await AUTH.destroy_session(user.id)
+    return redirect("/")
+
+
+@app.route("/profile", methods=["GET"], strict_slashes=False)
+async def profile() -> Tuple[Response, int]:
+    """
+    GET requests to the /profile endpoint to get user profile information.
+
+    Returns:
+        Tuple[Response, int]: A tuple containing the JSON response &
+        the HTTP status code.
+    """
+    session_id = request.cookies.get("session_id")
+
+    if not session_id:
+        abort(403)
+
+    user = await AUTH.get_user_from_session_id(session_id)
+
+    if not user:
+        abort(403)
+    return jsonify({
+        "email": user.email,
+        "message": "Profile information retrieved successfully"
+    }), 200
+
+
+@app.route("/reset_password", methods=["POST"], strict_slashes=False)
+async def get_reset_password_token() -> Tuple[Response, int]:
+    """
+    POST requests to the /reset_password endpoint to generate
+    a reset token for the user's password.
+
+    Returns:
+        Tuple[Response, int]: A tuple containing the JSON response and
+        the HTTP status code.
+    """
+    email = (await request.form).get("email")
+    try:
+        reset_token = await AUTH.get_reset_password_token(email)
+    except ValueError:
+        abort(403)
+    return jsonify({"email": email, "reset_token": reset_token}), 200
+
+
+@app.route("/reset_password", methods=["PUT"], strict_slashes=False)
+async def update_password() -> str:
+    """
+    PUT requests to the /reset_password endpoint to update
+    a user's password.
+
+    Returns:
+        Tuple[Response, int]: A tuple containing the JSON response and
+        the HTTP status code.
+    """
+    form = await request.form
+    response, error_msgs = utils.request_body_provided(
+        expected_fields={"email", "reset_token", "new_password"}, form=form
+    )
+    if not response:
+        return jsonify({"message": error_msgs}), 400
+    email = form.get("email")
+    reset_token = form.get("reset_token")
+    new_password = form.get("new_password")
+    try:
+        await AUTH.update_password(reset_token=reset_token,
+                                   password=new_password)
+    except ValueError:
+        abort(403)
+
+    return jsonify({"email": email, "message": "Password updated"}), 200
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    app.logger.info("Password hashing: %s", AUTH._hashing.describe())
+    app.run(host="0.0.0.0", port=5000)
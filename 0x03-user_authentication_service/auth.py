@@ -4,8 +4,9 @@ Hashed Password Utility module
 """
 
 from db import DB
+from hashing import get_pool
+from session_cache import CachedUser, session_cache_from_env
 from user import User
-import bcrypt
 from sqlalchemy.orm.exc import NoResultFound
 from uuid import uuid4
 from typing import Union
@@ -13,9 +14,9 @@ from typing import Union
 
 def _hash_password(password: str) -> bytes:
     """
-    Hashes a password using bcrypt
+    Hashes a password using bcrypt, in the shared hashing pool
     """
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+    return get_pool().hash(password)
 
 
 def _generate_uuid() -> str:
@@ -31,7 +32,13 @@ class Auth:
     """
 
     def __init__(self):
+        """
+        Initialize the database, the session cache and the hashing pool.
+        """
         self._db = DB()
+        self._sessions = session_cache_from_env()
+        # calibrate the bcrypt cost now rather than on the first hash
+        self._hashing = get_pool()
 
     def register_user(self, email: str, password: str) -> User:
         """
@@ -52,7 +59,8 @@ class Auth:
 
     def valid_login(self, email: str, password: str) -> bool:
         """
-        Validates a user's login credentials
+        Validates a user's login credentials, rehashing the stored
+        password if it was hashed with another bcrypt cost
 
         Args:
             email (str): user's email address
@@ -65,8 +73,16 @@ class Auth:
         except NoResultFound:
             return False
 
-        return bcrypt.checkpw(password.encode("utf-8"),
-                              user.hashed_password.encode("utf-8"))
+        hashed_password = user.hashed_password
+        if isinstance(hashed_password, str):
+            hashed_password = hashed_password.encode("utf-8")
+        pool = get_pool()
+        if not pool.check(password, hashed_password):
+            return False
+        if pool.needs_rehash(hashed_password):
+            self._db.update_user(user.id, hashed_password=_hash_password(
+                password).decode("utf-8"))
+        return True
 
     def create_session(self, email: str) -> Union[str, None]:
         """
@@ -79,31 +95,38 @@ class Auth:
             str | None: The new session ID if the user is found,
             None otherwise.
         """
-        try:
-            user = self._db.find_user_by(email=email)
-        except NoResultFound:
-            return None
-
         session_id = _generate_uuid()
-        self._db.update_user(user.id, session_id=session_id)
+        updated = self._db.update_users_by({"email": email},
+                                           session_id=session_id)
+        self._sessions.invalidate(email=email)
+        if updated == 0:
+            return None
         return session_id
 
-    def get_user_from_session_id(self, session_id: str) -> Union[User, None]:
+    def get_user_from_session_id(
+            self, session_id: str) -> Union[CachedUser, None]:
         """
-        Retrieve a user based on the given session ID.
+        Retrieve a user based on the given session ID, from the session
+        cache when possible.
 
         Args:
             session_id (str): The session ID used to identify the user.
 
         Returns:
-                The user object if found, otherwise None.
+                The user's id and email if found, otherwise None.
         """
         if session_id is None:
             return None
+        user = self._sessions.get(session_id)
+        if user is not None:
+            return user
+        generation = self._sessions.generation
         try:
-            user = self._db.find_user_by(session_id=session_id)
+            found = self._db.find_user_by(session_id=session_id)
         except NoResultFound:
             return None
+        user = CachedUser(id=found.id, email=found.email)
+        self._sessions.put(session_id, user, generation)
         return user
 
     def destroy_session(self, user_id: int) -> None:
@@ -116,11 +139,10 @@ class Auth:
         Returns:
             None
         """
-        try:
-            self._db.find_user_by(id=user_id)
-        except NoResultFound:
+        updated = self._db.update_users_by({"id": user_id}, session_id=None)
+        self._sessions.invalidate(user_id=user_id)
+        if updated == 0:
             raise ValueError(f"{user_id} is not a valid user ID.")
-        self._db.update_user(user_id=user_id, session_id=None)
 
     def get_reset_password_token(self, email: str) -> str:
         """
@@ -132,13 +154,10 @@ class Auth:
         Returns:
             str: The reset password token.
         """
-        try:
-            user = self._db.find_user_by(email=email)
-        except NoResultFound:
-            raise ValueError(f"{email} is not a valid email.")
-
         reset_token = _generate_uuid()
-        self._db.update_user(user.id, reset_token=reset_token)
+        if self._db.update_users_by({"email": email},
+                                    reset_token=reset_token) == 0:
+            raise ValueError(f"{email} is not a valid email.")
         return reset_token
 
     def update_password(self, reset_token: str, password: str) -> None:
@@ -160,3 +179,4 @@ class Auth:
         hashed_password = _hash_password(password)
         self._db.update_user(user.id, hashed_password=hashed_password,
                              reset_token=None)
+        self._sessions.invalidate(user_id=user.id)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Coroutine version of the Auth class, for the ASGI app
+"""
+import asyncio
+from concurrent.futures import Future
+from typing import Callable, Union
+
+from auth import _generate_uuid
+from db_async import AsyncDB
+from hashing import get_pool
+from session_cache import CachedUser, session_cache_from_env
+from user import User
+from sqlalchemy.orm.exc import NoResultFound
+
+
+async def _in_pool(submit: Callable[..., Future], *args) -> object:
+    """
+    Run a HashingPool operation without blocking the event loop.
+
+    Submitting may wait for a pending slot, so it happens in the loop's
+    default (bounded) executor; the bcrypt work itself then runs in the
+    pool and is awaited as an asyncio future.
+    """
+    loop = asyncio.get_running_loop()
+    future = await loop.run_in_executor(None, submit, *args)
+    return await asyncio.wrap_future(future)
+
+
+async def _hash_password(password: str) -> bytes:
+    """
+    Hashes a password using bcrypt, in the shared hashing pool
+    """
+    return await _in_pool(get_pool().submit_hash, password)
+
+
+class AsyncAuth:
+    """
+    Authentication class whose methods are coroutines: database calls
+    go through AsyncDB and bcrypt through the hashing pool, so neither
+    holds up the event loop.
+    """
+
+    def __init__(self, url: str = None):
+        """
+        Initialize the async database, the session cache and the
+        hashing pool.
+        """
+        self._db = AsyncDB(url)
+        self._sessions = session_cache_from_env()
+        # calibrate the bcrypt cost now rather than on the first hash
+        self._hashing = get_pool()
+
+    async def register_user(self, email: str, password: str) -> User:
+        """
+        Registers a new user with the given email and password
+        """
+        if not email:
+            raise ValueError("Email cannot be empty")
+        if not password:
+            raise ValueError("Password cannot be empty")
+
+        try:
+            await self._db.find_user_by(email=email)
+            raise ValueError(f"User {email} already exists")
+        except NoResultFound:
+            hashed_password = (await _hash_password(password)).decode()
+            return await self._db.add_user(email=email,
+                                           hashed_password=hashed_password)
+
+    async def valid_login(self, email: str, password: str) -> bool:
+        """
+        Validates a user's login credentials, rehashing the stored
+        password if it was hashed with another bcrypt cost
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            return False
+
+        hashed_password = user.hashed_password
+        if isinstance(hashed_password, str):
+            hashed_password = hashed_password.encode("utf-8")
+        pool = get_pool()
+        if not await _in_pool(pool.submit_check, password, hashed_password):
+            return False
+        if pool.needs_rehash(hashed_password):
+            await self._db.update_user(user.id, hashed_password=(
+                await _hash_password(password)).decode("utf-8"))
+        return True
+
+    async def create_session(self, email: str) -> Union[str, None]:
+        """
+        Creates a new session for the user with the given email, and
+        returns its ID (None if the user is not found)
+        """
+        session_id = _generate_uuid()
+        updated = await self._db.update_users_by({"email": email},
+                                                 session_id=session_id)
+        self._sessions.invalidate(email=email)
+        if updated == 0:
+            return None
+        return session_id
+
+    async def get_user_from_session_id(
+            self, session_id: str) -> Union[CachedUser, None]:
+        """
+        Retrieve the user's id and email based on the given session ID,
+        from the session cache when possible
+        """
+        if session_id is None:
+            return None
+        user = self._sessions.get(session_id)
+        if user is not None:
+            return user
+        generation = self._sessions.generation
+        try:
+            found = await self._db.find_user_by(session_id=session_id)
+        except NoResultFound:
+            return None
+        user = CachedUser(id=found.id, email=found.email)
+        self._sessions.put(session_id, user, generation)
+        return user
+
+    async def destroy_session(self, user_id: int) -> None:
+        """
+        Destroy a user session by setting their session ID to None
+        """
+        updated = await self._db.update_users_by({"id": user_id},
+                                                 session_id=None)
+        self._sessions.invalidate(user_id=user_id)
+        if updated == 0:
+            raise ValueError(f"{user_id} is not a valid user ID.")
+
+    async def get_reset_password_token(self, email: str) -> str:
+        """
+        Generate a reset password token for the user with the given email
+        """
+        reset_token = _generate_uuid()
+        if await self._db.update_users_by({"email": email},
+                                          reset_token=reset_token) == 0:
+            raise ValueError(f"{email} is not a valid email.")
+        return reset_token
+
+    async def update_password(self, reset_token: str, password: str) -> None:
+        """
+        Update the password of a user with the given reset token
+        """
+        try:
+            user = await self._db.find_user_by(reset_token=reset_token)
+        except NoResultFound:
+            raise ValueError(f"{reset_token} is not a valid reset token.")
+
+        hashed_password = await _hash_password(password)
+        await self._db.update_user(user.id,
+                                   hashed_password=hashed_password.decode(),
+                                   reset_token=None)
+        self._sessions.invalidate(user_id=user.id)
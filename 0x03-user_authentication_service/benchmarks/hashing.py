@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Logins/sec (bcrypt.checkpw) through a HashingPool of 1 to CPU-count
+workers, all fed concurrently
+
+    python3 -m benchmarks.hashing [LOGINS] [ROUNDS]
+"""
+import os
+import sys
+import time
+
+import bcrypt
+
+from hashing import HashingPool
+
+
+def logins_per_sec(workers: int, hashed: bytes, logins: int) -> float:
+    """
+    Check `logins` passwords through a pool of `workers` threads.
+    """
+    pool = HashingPool(workers=workers, max_pending=logins)
+    started = time.perf_counter()
+    futures = [pool.submit_check("password", hashed) for _ in range(logins)]
+    assert all(future.result() for future in futures)
+    elapsed = time.perf_counter() - started
+    pool.shutdown()
+    return logins / elapsed
+
+
+if __name__ == "__main__":
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    hashed = bcrypt.hashpw(b"password", bcrypt.gensalt(rounds))
+    cores = os.cpu_count() or 1
+    workers = 1
+    print("{} logins, cost {}, {} cores".format(logins, rounds, cores))
+    while True:
+        print("  {:>3} workers: {:8.1f} logins/sec".format(
+            workers, logins_per_sec(workers, hashed, logins)))
+        if workers >= cores:
+            break
+        workers = min(workers * 2, cores)
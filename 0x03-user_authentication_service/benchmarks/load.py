@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Load test of the sync (threaded WSGI) and async (ASGI) servers
+
+Each mode is served from a subprocess on the same SQLite file. IDLE
+clients open a connection and send half a request, like slow mobile
+clients, while CONCURRENCY keep-alive clients run REQUESTS GET /profile
+in total. Reports requests/sec, latency percentiles and the server's
+thread count.
+
+    python3 -m benchmarks.load [IDLE] [REQUESTS] [CONCURRENCY]
+
+The sync mode needs flask, the async one quart, uvicorn and aiosqlite.
+"""
+import asyncio
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+HOST = "127.0.0.1"
+EMAIL = "bob@example.com"
+PASSWORD = "b0b"
+
+
+def serve(mode: str, port: int) -> None:
+    """
+    Serve app.py (sync) or app_async.py (async) on `port`.
+    """
+    if mode == "sync":
+        from werkzeug.serving import make_server
+        from app import app
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        make_server(HOST, port, app, threaded=True).serve_forever()
+    else:
+        import uvicorn
+        from app_async import app
+        uvicorn.run(app, host=HOST, port=port, log_level="warning",
+                    backlog=4096)
+
+
+def free_port() -> int:
+    """
+    Return a TCP port nobody listens on.
+    """
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def server_threads(pid: int) -> int:
+    """
+    Number of threads of a process (Linux only, 0 elsewhere).
+    """
+    try:
+        with open("/proc/{}/status".format(pid)) as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class Connection:
+    """
+    HTTP/1.1 client connection, reopened when the server closes it
+    (the threaded WSGI server answers "Connection: close").
+    """
+
+    def __init__(self, port: int) -> None:
+        """
+        Target the server listening on `port`.
+        """
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, body: dict = None,
+                      cookie: str = None):
+        """
+        Send one request and return its status and headers (the body
+        is read and dropped).
+        """
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                HOST, self.port)
+        data = urlencode(body or {}).encode()
+        head = ["{} {} HTTP/1.1".format(method, path), "Host: " + HOST,
+                "Content-Length: {}".format(len(data))]
+        if body is not None:
+            head.append("Content-Type: application/x-www-form-urlencoded")
+        if cookie:
+            head.append("Cookie: session_id=" + cookie)
+        self.writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + data)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = (await self.reader.readline()).decode().strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers.setdefault(name.lower(), []).append(value.strip())
+        length = int(headers.get("content-length", ["0"])[0])
+        await self.reader.readexactly(length)
+        if headers.get("connection", [""])[0].lower() == "close":
+            self.close()
+        return status, headers
+
+    def close(self) -> None:
+        """
+        Close the connection.
+        """
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def login(port: int) -> str:
+    """
+    Register the test user if needed, log in and return the session ID.
+    """
+    conn = Connection(port)
+    credentials = {"email": EMAIL, "password": PASSWORD}
+    await conn.request("POST", "/users", credentials)
+    status, headers = await conn.request("POST", "/sessions", credentials)
+    conn.close()
+    assert status == 200, status
+    for cookie in headers["set-cookie"]:
+        name, _, value = cookie.split(";")[0].partition("=")
+        if name == "session_id":
+            return value
+    raise AssertionError("no session_id cookie")
+
+
+async def open_idle(port: int, idle: int) -> list:
+    """
+    Open `idle` connections that send half a request and stall.
+    """
+    async def one():
+        """
+        Open one stalled connection and return its writer.
+        """
+        reader, writer = await asyncio.open_connection(HOST, port)
+        writer.write("GET /profile HTTP/1.1\r\nHost: {}\r\n".format(
+            HOST).encode())
+        await writer.drain()
+        return writer
+    writers = []
+    for start in range(0, idle, 200):
+        writers += await asyncio.gather(*(one() for _ in range(
+            start, min(start + 200, idle))))
+    return writers
+
+
+async def hammer(port: int, session_id: str, requests: int,
+                 concurrency: int) -> list:
+    """
+    Run `requests` GET /profile over `concurrency` keep-alive
+    connections (as far as the server keeps them alive) and return
+    each request's latency in seconds.
+    """
+    latencies = []
+    remaining = [requests]
+
+    async def client():
+        """
+        Send requests over one connection until none remain.
+        """
+        conn = Connection(port)
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            started = time.perf_counter()
+            status, _ = await conn.request("GET", "/profile",
+                                           cookie=session_id)
+            latencies.append(time.perf_counter() - started)
+            assert status == 200, status
+        conn.close()
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies
+
+
+async def run(mode: str, idle: int, requests: int, concurrency: int,
+              env: dict) -> None:
+    """
+    Start a server in `mode`, load it and print the results.
+    """
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.load", "serve", mode, str(port)],
+        env=env)
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection((HOST, port)).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        session_id = await login(port)
+        idle_writers = await open_idle(port, idle)
+        started = time.perf_counter()
+        latencies = sorted(await hammer(port, session_id, requests,
+                                        concurrency))
+        elapsed = time.perf_counter() - started
+        threads = server_threads(server.pid)
+        for writer in idle_writers:
+            writer.close()
+        print("{:<6} {:9.0f} req/s  p50 {:6.1f} ms  p99 {:6.1f} ms  "
+              "{:5} threads".format(
+                  mode, len(latencies) / elapsed,
+                  latencies[len(latencies) // 2] * 1000,
+                  latencies[int(len(latencies) * 0.99)] * 1000, threads))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["serve"]:
+        serve(sys.argv[2], int(sys.argv[3]))
+        sys.exit(0)
+    idle = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, HASHING_COST=os.getenv("HASHING_COST", "4"),
+                   USER_AUTH_DB_URL="sqlite:///" + os.path.join(tmp, "a.db"))
+        print("{} idle clients, {} requests over {} connections".format(
+            idle, requests, concurrency))
+        for mode in ("sync", "async"):
+            asyncio.run(run(mode, idle, requests, concurrency, env))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Latency of DB.find_user_by(email=...), session_id and reset_token with
+and without the users indexes, at 10k, 100k and 1M users
+
+    python3 -m benchmarks.lookup [N ...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from uuid import uuid4
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from migrations import migrate
+from user import User
+
+LOOKUPS = 200
+
+
+def populate(engine, n: int) -> list:
+    """
+    Insert `n` users and return the rows as dictionaries.
+    """
+    rows = [{"email": "user{}@example.com".format(i),
+             "hashed_password": "hash",
+             "session_id": str(uuid4()),
+             "reset_token": str(uuid4())} for i in range(n)]
+    with engine.begin() as conn:
+        for start in range(0, n, 10000):
+            conn.execute(User.__table__.insert(), rows[start:start + 10000])
+    return rows
+
+
+def mean_lookup_ms(session, rows: list, column: str) -> float:
+    """
+    Mean time of a filter_by(...).first() lookup on `column`.
+    """
+    sample = random.sample(rows, min(LOOKUPS, len(rows)))
+    started = time.perf_counter()
+    for row in sample:
+        session.query(User).filter_by(**{column: row[column]}).first()
+    return (time.perf_counter() - started) / len(sample) * 1000
+
+
+def run(n: int) -> None:
+    """
+    Print lookup latencies for a database of `n` users.
+    """
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        engine = create_engine("sqlite:///{}".format(path))
+        migrate(engine)
+        rows = populate(engine, n)
+        session = sessionmaker(bind=engine)()
+        columns = ("email", "session_id", "reset_token")
+        indexed = [mean_lookup_ms(session, rows, c) for c in columns]
+        session.close()
+        for index in User.__table__.indexes:
+            index.drop(engine)
+        session = sessionmaker(bind=engine)()
+        scanned = [mean_lookup_ms(session, rows, c) for c in columns]
+        session.close()
+        print("{} users".format(n))
+        for column, with_index, without in zip(columns, indexed, scanned):
+            print("  {:<12} indexed {:8.3f} ms   scan {:9.3f} ms".format(
+                column, with_index, without))
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    for n in [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]:
+        run(n)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Count the SQL statements issued by the Auth flows, next to the
+load-then-update flows they replaced, on an in-memory database
+
+    python3 -m benchmarks.round_trips
+"""
+import os
+
+os.environ.setdefault("USER_AUTH_DB_URL", "sqlite://")
+os.environ.setdefault("HASHING_COST", "4")
+
+from sqlalchemy import event  # noqa: E402
+
+from auth import Auth, _generate_uuid  # noqa: E402
+
+EMAIL = "bob@example.com"
+PASSWORD = "b0b"
+
+
+class StatementCounter:
+    """
+    Count the statements executed on an engine.
+    """
+
+    def __init__(self, engine) -> None:
+        """
+        Listen to the statements of `engine`.
+        """
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *_) -> None:
+        """
+        Count one statement.
+        """
+        self.count += 1
+
+    def measure(self, flow) -> int:
+        """
+        Return the number of statements issued by `flow()`.
+        """
+        before = self.count
+        flow()
+        return self.count - before
+
+
+def legacy_create_session(auth: Auth) -> None:
+    """
+    create_session as it was: find the user, then update by ID.
+    """
+    user = auth._db.find_user_by(email=EMAIL)
+    user.session_id = _generate_uuid()
+    auth._db._session.commit()
+
+
+def legacy_get_reset_password_token(auth: Auth) -> None:
+    """
+    get_reset_password_token as it was: find, then update by ID.
+    """
+    user = auth._db.find_user_by(email=EMAIL)
+    user.reset_token = _generate_uuid()
+    auth._db._session.commit()
+
+
+def legacy_destroy_session(auth: Auth, user_id: int) -> None:
+    """
+    destroy_session as it was: check the ID, then load and update.
+    """
+    auth._db.find_user_by(id=user_id)
+    user = auth._db.find_user_by(id=user_id)
+    user.session_id = None
+    auth._db._session.commit()
+
+
+if __name__ == "__main__":
+    auth = Auth()
+    user_id = auth.register_user(EMAIL, PASSWORD).id
+    counter = StatementCounter(auth._db._engine)
+
+    def expire() -> None:
+        """
+        Drop cached objects so each flow starts cold, like a request.
+        """
+        auth._db._session.expire_all()
+
+    flows = [
+        ("create_session",
+         lambda: legacy_create_session(auth),
+         lambda: auth.create_session(EMAIL)),
+        ("get_reset_password_token",
+         lambda: legacy_get_reset_password_token(auth),
+         lambda: auth.get_reset_password_token(EMAIL)),
+        ("destroy_session",
+         lambda: legacy_destroy_session(auth, user_id),
+         lambda: auth.destroy_session(user_id)),
+    ]
+    print("{:<26} {:>7} {:>7}".format("statements", "before", "after"))
+    for name, before, after in flows:
+        expire()
+        n_before = counter.measure(before)
+        expire()
+        n_after = counter.measure(after)
+        print("{:<26} {:>7} {:>7}".format(name, n_before, n_after))
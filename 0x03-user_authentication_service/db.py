@@ -2,15 +2,67 @@
 """DB module
 """
 
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.orm.session import Session
+from sqlalchemy.pool import QueuePool, StaticPool
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.exc import InvalidRequestError, IntegrityError
 
 
-from user import Base, User
+from migrations import migrate
+from user import User
+
+DEFAULT_DB_URL = "sqlite:///a.db"
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+def _create_engine(url: str) -> Engine:
+    """
+    Create the engine for `url`.
+
+    File-based SQLite databases get a connection pool shared across
+    threads and are switched to WAL mode, so readers don't wait for
+    writers. Other databases get a pool sized by DB_POOL_SIZE and
+    DB_MAX_OVERFLOW.
+    """
+    if not url.startswith("sqlite"):
+        return create_engine(
+            url, echo=False, pool_pre_ping=True,
+            pool_size=int(os.getenv("DB_POOL_SIZE", 10)),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 20)))
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # a single connection, so every thread sees the same database
+        return create_engine(url, echo=False, poolclass=StaticPool,
+                             connect_args={"check_same_thread": False})
+
+    engine = create_engine(
+        url, echo=False, poolclass=QueuePool,
+        pool_size=int(os.getenv("DB_POOL_SIZE", 10)),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 20)),
+        connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, _):
+        """
+        Tune every new SQLite connection.
+        """
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return engine
 
 
 class DB:
@@ -18,24 +70,29 @@ class DB:
     DB class to manage Databse operations
     """
 
-    def __init__(self) -> None:
+    def __init__(self, url: str = None) -> None:
         """
-        Initialize a new DB instance
+        Initialize a new DB instance on `url` (USER_AUTH_DB_URL, else
+        sqlite:///a.db), creating or migrating the schema as needed
         """
-        self._engine = create_engine("sqlite:///a.db", echo=False)
-        Base.metadata.drop_all(self._engine)
-        Base.metadata.create_all(self._engine)
-        self.__session = None
+        url = url or os.getenv("USER_AUTH_DB_URL", DEFAULT_DB_URL)
+        self._engine = _create_engine(url)
+        migrate(self._engine)
+        self.__session = scoped_session(sessionmaker(bind=self._engine))
 
     @property
     def _session(self) -> Session:
         """
-        Memoized session object
+        Session object of the current thread
         """
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        return self.__session()
+
+    def close_session(self) -> None:
+        """
+        Close the session of the current thread, returning its
+        connection to the pool (call at the end of each request)
+        """
+        self.__session.remove()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """
@@ -83,23 +140,45 @@ class DB:
 
         return user
 
-    def update_user(self, user_id: int, **kwargs) -> None:
-        """Update a user's attributes based on the provided keyword arguments.
+    def update_users_by(self, filters: dict, **kwargs) -> int:
+        """Update the users matching `filters` with a single
+        UPDATE ... WHERE statement, without loading them first.
 
         Args:
-            user_id (int): The ID of the user to update.
-            **kwargs: Arbitrary keyword arguments used to update the
-            user's attributes.
+            filters (dict): Column values the users must match.
+            **kwargs: Column values to set.
+
+        Returns:
+            int: The number of updated users.
 
         Raises:
-            InvalidRequestError: If the update arguments are invalid.
+            InvalidRequestError: If a filter argument is invalid.
+            ValueError: If an update argument is invalid.
         """
-
-        user = self.find_user_by(id=user_id)
         valid_attributes = {"email", "hashed_password",
                             "session_id", "reset_token"}
-        for key, value in kwargs.items():
+        for key in filters:
+            if not hasattr(User, key):
+                raise InvalidRequestError(f"Invalid query argument: {key}")
+        for key in kwargs:
             if key not in valid_attributes:
                 raise ValueError(f"Invalid attribute: {key}")
-            setattr(user, key, value)
+        count = self._session.query(User).filter_by(**filters).update(
+            kwargs, synchronize_session="evaluate")
         self._session.commit()
+        return count
+
+    def update_user(self, user_id: int, **kwargs) -> None:
+        """Update a user's attributes based on the provided keyword arguments.
+
+        Args:
+            user_id (int): The ID of the user to update.
+            **kwargs: Arbitrary keyword arguments used to update the
+            user's attributes.
+
+        Raises:
+            NoResultFound: If no user has this ID.
+            ValueError: If the update arguments are invalid.
+        """
+        if self.update_users_by({"id": user_id}, **kwargs) == 0:
+            raise NoResultFound("No user found matching the criteria.")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Async DB module, on SQLAlchemy asyncio (1.4+) and aiosqlite
+"""
+
+import os
+
+from sqlalchemy import event, select, update
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+
+from db import DEFAULT_DB_URL, SQLITE_PRAGMAS
+from migrations import migrate
+from user import User
+
+VALID_ATTRIBUTES = {"email", "hashed_password", "session_id", "reset_token"}
+
+
+def async_url(url: str) -> str:
+    """
+    Return the async driver URL of a database URL: sqlite:// becomes
+    sqlite+aiosqlite://, URLs naming a driver are kept as they are.
+    """
+    scheme, sep, rest = url.partition("://")
+    if scheme == "sqlite":
+        return "sqlite+aiosqlite" + sep + rest
+    return url
+
+
+def _create_async_engine(url: str) -> AsyncEngine:
+    """
+    Create the async engine for `url`, tuned like db._create_engine.
+    """
+    if not url.startswith("sqlite"):
+        return create_async_engine(
+            url, echo=False, pool_pre_ping=True,
+            pool_size=int(os.getenv("DB_POOL_SIZE", 10)),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 20)))
+    if url.endswith("://") or url.endswith(":memory:"):
+        # a single connection, so every task sees the same database
+        return create_async_engine(url, echo=False, poolclass=StaticPool)
+
+    engine = create_async_engine(
+        url, echo=False, poolclass=AsyncAdaptedQueuePool,
+        pool_size=int(os.getenv("DB_POOL_SIZE", 10)),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 20)))
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, _):
+        """
+        Tune every new SQLite connection.
+        """
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return engine
+
+
+class AsyncDB:
+    """
+    Coroutine twin of DB: the same methods, awaited, each running in its
+    own short-lived session so concurrent tasks never share one.
+    """
+
+    def __init__(self, url: str = None) -> None:
+        """
+        Initialize a new AsyncDB instance on `url` (USER_AUTH_DB_URL
+        with its async driver, else sqlite+aiosqlite:///a.db); await
+        `migrate` before use.
+        """
+        url = url or os.getenv("USER_AUTH_DB_URL", DEFAULT_DB_URL)
+        self._engine = _create_async_engine(async_url(url))
+        self._sessionmaker = sessionmaker(bind=self._engine,
+                                          class_=AsyncSession,
+                                          expire_on_commit=False)
+
+    async def migrate(self) -> int:
+        """
+        Create or migrate the schema and return its version.
+        """
+        async with self._engine.connect() as conn:
+            return await conn.run_sync(lambda sync_conn: migrate(
+                sync_conn.engine))
+
+    async def close(self) -> None:
+        """
+        Close every pooled connection.
+        """
+        await self._engine.dispose()
+
+    async def add_user(self, email: str, hashed_password: str) -> User:
+        """
+        Add a new user to the database.
+
+        Args:
+            email (str): The email address of the user.
+            hashed_password (str): The hashed password of the user.
+
+        Returns:
+            User: The newly created User object.
+        """
+        new_user = User(email=email, hashed_password=hashed_password)
+        async with self._sessionmaker() as session:
+            session.add(new_user)
+            await session.commit()
+        return new_user
+
+    async def find_user_by(self, **kwargs) -> User:
+        """
+        Find a user by filtering with the given keyword arguments.
+
+        Returns:
+            User: The first User object that matches the filter criteria.
+
+        Raises:
+            NoResultFound: If no results are found matching the criteria.
+            InvalidRequestError: If the query arguments are invalid.
+        """
+        for key in kwargs:
+            if not hasattr(User, key):
+                raise InvalidRequestError(f"Invalid query argument: {key}")
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                select(User).filter_by(**kwargs).limit(1))
+            user = result.scalars().first()
+        if user is None:
+            raise NoResultFound("No user found matching the criteria.")
+        return user
+
+    async def update_users_by(self, filters: dict, **kwargs) -> int:
+        """Update the users matching `filters` with a single
+        UPDATE ... WHERE statement.
+
+        Returns:
+            int: The number of updated users.
+
+        Raises:
+            InvalidRequestError: If a filter argument is invalid.
+            ValueError: If an update argument is invalid.
+        """
+        for key in filters:
+            if not hasattr(User, key):
+                raise InvalidRequestError(f"Invalid query argument: {key}")
+        for key in kwargs:
+            if key not in VALID_ATTRIBUTES:
+                raise ValueError(f"Invalid attribute: {key}")
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                update(User).filter_by(**filters).values(**kwargs)
+                .execution_options(synchronize_session=False))
+            await session.commit()
+        return result.rowcount
+
+    async def update_user(self, user_id: int, **kwargs) -> None:
+        """Update a user's attributes based on the provided keyword arguments.
+
+        Raises:
+            NoResultFound: If no user has this ID.
+            ValueError: If the update arguments are invalid.
+        """
+        if await self.update_users_by({"id": user_id}, **kwargs) == 0:
+            raise NoResultFound("No user found matching the criteria.")
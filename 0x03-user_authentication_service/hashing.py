@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Bounded pool running bcrypt off the calling thread
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import bcrypt
+
+DEFAULT_COST = 12
+
+logger = logging.getLogger(__name__)
+
+
+def calibrate_cost(target_ms: float = 100, min_cost: int = 10,
+                   max_cost: int = 16) -> Tuple[int, Dict[int, float]]:
+    """
+    Pick the highest bcrypt cost whose hash time fits `target_ms`.
+
+    Costs are timed from 4 upwards until one exceeds the target (each
+    step doubles the work); the result is never below `min_cost`.
+
+    Returns:
+        Tuple[int, Dict[int, float]]: The chosen cost, and the measured
+        hash time in milliseconds for each cost tried.
+    """
+    timings = {}
+    cost = min_cost
+    for rounds in range(4, max_cost + 1):
+        started = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds))
+        timings[rounds] = (time.perf_counter() - started) * 1000
+        if timings[rounds] > target_ms:
+            break
+        cost = max(rounds, min_cost)
+    return cost, timings
+
+
+def hash_cost(hashed_password: bytes) -> int:
+    """
+    Return the cost factor stored in a bcrypt hash ($2b$<cost>$...).
+    """
+    return int(hashed_password.split(b"$")[2])
+
+
+class HashingPoolBusy(Exception):
+    """
+    Raised when the pool has too many pending hashes to accept another.
+    """
+
+
+class HashingPool:
+    """
+    Thread pool for bcrypt, which releases the GIL while hashing.
+
+    At most `max_pending` hashes are queued or running: past that,
+    submissions wait for a slot for up to `timeout` seconds (forever if
+    None) and then raise HashingPoolBusy.
+    """
+
+    def __init__(self, workers: Optional[int] = None,
+                 max_pending: Optional[int] = None,
+                 timeout: Optional[float] = None,
+                 cost: int = DEFAULT_COST) -> None:
+        """
+        Initialize the pool.
+
+        Args:
+            workers (int): Number of threads, defaults to the CPU count.
+            max_pending (int): Queue bound, defaults to 8 per worker.
+            timeout (float): Seconds to wait for a slot when full.
+            cost (int): bcrypt cost factor of new hashes.
+        """
+        self.cost = cost
+        self.cost_timings = {}
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 8
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of hashes queued or running.
+        """
+        return self._pending
+
+    def _submit(self, fn, *args) -> Future:
+        """
+        Schedule `fn(*args)` once a pending slot is free.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashingPoolBusy(
+                f"{self.max_pending} bcrypt operations already pending")
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _: Optional[Future]) -> None:
+        """
+        Free the pending slot of a finished hash.
+        """
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def submit_hash(self, password: str, salt: bytes = None) -> Future:
+        """
+        Hash a password in the pool.
+
+        Returns:
+            Future: Resolves to the salted bcrypt hash (bytes).
+        """
+        return self._submit(bcrypt.hashpw, password.encode("utf-8"),
+                            salt or bcrypt.gensalt(self.cost))
+
+    def submit_check(self, password: str, hashed_password: bytes) -> Future:
+        """
+        Check a password against a bcrypt hash in the pool.
+
+        Returns:
+            Future: Resolves to True if the password matches.
+        """
+        return self._submit(bcrypt.checkpw, password.encode("utf-8"),
+                            hashed_password)
+
+    def hash(self, password: str, salt: bytes = None) -> bytes:
+        """
+        Hash a password in the pool and wait for the result.
+        """
+        return self.submit_hash(password, salt).result()
+
+    def check(self, password: str, hashed_password: bytes) -> bool:
+        """
+        Check a password in the pool and wait for the result.
+        """
+        return self.submit_check(password, hashed_password).result()
+
+    def needs_rehash(self, hashed_password: bytes) -> bool:
+        """
+        Tell whether a hash was made with another cost than the pool's.
+        """
+        try:
+            return hash_cost(hashed_password) != self.cost
+        except (IndexError, ValueError):
+            return False
+
+    def calibrate(self, target_ms: float) -> int:
+        """
+        Set the cost of new hashes to the highest one fitting
+        `target_ms`, log the measurements and return the cost.
+        """
+        self.cost, self.cost_timings = calibrate_cost(target_ms)
+        logger.info("%s, for a %g ms target", self.describe(), target_ms)
+        return self.cost
+
+    def describe(self) -> str:
+        """
+        Describe the cost of new hashes and the timings it was
+        calibrated from, if any.
+        """
+        if not self.cost_timings:
+            return "bcrypt cost {}".format(self.cost)
+        return "bcrypt cost {} ({})".format(self.cost, ", ".join(
+            "{}: {:.1f} ms".format(rounds, ms)
+            for rounds, ms in self.cost_timings.items()))
+
+    def shutdown(self) -> None:
+        """
+        Wait for pending hashes and stop the threads.
+        """
+        self._executor.shutdown(wait=True)
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> HashingPool:
+    """
+    Return the process-wide pool sized by HASHING_WORKERS,
+    HASHING_MAX_PENDING and HASHING_TIMEOUT.
+
+    New hashes use the cost HASHING_COST if set, otherwise the cost
+    calibrated against HASHING_TARGET_MS (100 ms) when the pool is
+    created: call it at startup so no request pays for the calibration.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            timeout = os.getenv("HASHING_TIMEOUT")
+            _POOL = HashingPool(
+                workers=int(os.getenv("HASHING_WORKERS", 0)) or None,
+                max_pending=int(os.getenv("HASHING_MAX_PENDING", 0)) or None,
+                timeout=float(timeout) if timeout else None)
+            if os.getenv("HASHING_COST"):
+                _POOL.cost = int(os.getenv("HASHING_COST"))
+            else:
+                _POOL.calibrate(float(os.getenv("HASHING_TARGET_MS", 100)))
+        return _POOL
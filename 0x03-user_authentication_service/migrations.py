@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Schema migrations for the user authentication database
+"""
+from typing import Callable, List
+import logging
+
+from sqlalchemy import (Column, Index, Integer, MetaData, Table, func,
+                        inspect, select)
+from sqlalchemy.engine import Connection, Engine
+
+from user import Base, User
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+schema_version = Table("schema_version", _metadata,
+                       Column("version", Integer, primary_key=True))
+
+
+def _create_users_table(conn: Connection) -> None:
+    """
+    Create the users table (with its indexes) if it doesn't exist.
+    """
+    Base.metadata.create_all(conn, tables=[User.__table__])
+
+
+def _index_lookup_columns(conn: Connection) -> None:
+    """
+    Add the indexes on email, session_id and reset_token to a users
+    table created before they were declared.
+
+    The old schema didn't enforce unique emails: if the table already
+    holds duplicates, the email index is created non-unique and the
+    duplicates are logged, to be cleaned up by hand.
+    """
+    existing = {index["name"] for index in inspect(conn).get_indexes(
+        User.__tablename__)}
+    for index in User.__table__.indexes:
+        if index.name in existing:
+            continue
+        if index.unique:
+            duplicates = _duplicates(conn, index)
+            if duplicates:
+                logger.warning(
+                    "%s: duplicate values %s, creating a non-unique "
+                    "index", index.name, ", ".join(map(repr, duplicates)))
+                # on a detached copy of the table, so the declared
+                # (unique) index keeps applying to new databases
+                table = Table(User.__tablename__, MetaData(), *(
+                    Column(c.name, c.type) for c in index.columns))
+                index = Index(index.name, *(
+                    table.c[c.name] for c in index.columns))
+        index.create(conn)
+
+
+def _duplicates(conn: Connection, index: Index, limit: int = 10) -> list:
+    """
+    Return up to `limit` values appearing more than once in the columns
+    of an index.
+    """
+    columns = list(index.columns)
+    rows = conn.execute(
+        select(columns).group_by(*columns)
+        .having(func.count() > 1).limit(limit))
+    return [row[0] if len(row) == 1 else tuple(row) for row in rows]
+
+
+MIGRATIONS: List[Callable[[Connection], None]] = [
+    _create_users_table,
+    _index_lookup_columns,
+]
+
+
+def current_version(engine: Engine) -> int:
+    """
+    Return the schema version of the database (0 if never migrated).
+    """
+    _metadata.create_all(engine)
+    with engine.connect() as conn:
+        versions = [row[0] for row in conn.execute(
+            select([schema_version.c.version]))]
+    return max(versions, default=0)
+
+
+def migrate(engine: Engine) -> int:
+    """
+    Apply, in order and each in its own transaction, the migrations the
+    database hasn't seen yet, and return the resulting schema version.
+    """
+    version = current_version(engine)
+    for target, migration in enumerate(MIGRATIONS, start=1):
+        if target <= version:
+            continue
+        with engine.begin() as conn:
+            migration(conn)
+            conn.execute(schema_version.insert().values(version=target))
+        version = target
+    return version
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Read-through cache from session IDs to the users they belong to
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+
+class CachedUser(NamedTuple):
+    """
+    Lightweight view of a user, detached from any database session.
+    """
+    id: int
+    email: str
+
+
+class SessionCache:
+    """
+    LRU cache of session ID -> CachedUser whose entries expire after
+    `ttl` seconds.
+
+    A user has a single session ID, so entries are also indexed by
+    user ID and email: Auth invalidates them by whichever it knows.
+    Invalidation is local to the process, the TTL bounds how long
+    another process may serve a stale entry.
+    """
+
+    def __init__(self, ttl: float = 30, max_size: int = 10000) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            ttl (float): Seconds an entry is served for, 0 disables
+                the cache.
+            max_size (int): Maximum number of entries.
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._by_id = {}
+        self._by_email = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evicted = 0
+
+    def get(self, session_id: str) -> Optional[CachedUser]:
+        """
+        Return the cached user of a session ID, or None if it is
+        missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self._misses += 1
+                return None
+            user, deadline = entry
+            if deadline <= time.monotonic():
+                self._pop(session_id)
+                self._misses += 1
+                return None
+            self._entries.move_to_end(session_id)
+            self._hits += 1
+            return user
+
+    @property
+    def generation(self) -> int:
+        """
+        Counter bumped by every invalidation, to read before a lookup
+        and pass to `put`.
+        """
+        return self._generation
+
+    def put(self, session_id: str, user: CachedUser,
+            generation: int = None) -> None:
+        """
+        Cache the user of a session ID, unless an invalidation happened
+        since `generation` was read: the user may be stale already.
+        """
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._pop(session_id)
+            self._pop(self._by_id.get(user.id))
+            self._pop(self._by_email.get(user.email))
+            self._entries[session_id] = (user, time.monotonic() + self.ttl)
+            self._by_id[user.id] = session_id
+            self._by_email[user.email] = session_id
+            while len(self._entries) > self.max_size:
+                self._pop(next(iter(self._entries)))
+                self._evicted += 1
+
+    def invalidate(self, session_id: str = None, user_id: int = None,
+                   email: str = None) -> None:
+        """
+        Drop the entry of a session ID, user ID or email.
+        """
+        with self._lock:
+            self._generation += 1
+            self._pop(session_id)
+            self._pop(self._by_id.get(user_id))
+            self._pop(self._by_email.get(email))
+
+    def clear(self) -> None:
+        """
+        Drop every entry.
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._by_id.clear()
+            self._by_email.clear()
+
+    def _pop(self, session_id: Optional[str]) -> None:
+        """
+        Remove an entry and its index keys; the lock must be held.
+        """
+        if session_id is None:
+            return
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return
+        user = entry[0]
+        if self._by_id.get(user.id) == session_id:
+            del self._by_id[user.id]
+        if self._by_email.get(user.email) == session_id:
+            del self._by_email[user.email]
+
+    def __len__(self) -> int:
+        """
+        Number of cached entries, including expired ones.
+        """
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the size and the hit, miss and eviction counters.
+        """
+        return {"size": len(self), "hits": self._hits,
+                "misses": self._misses, "evicted": self._evicted}
+
+
+def session_cache_from_env() -> SessionCache:
+    """
+    Build the cache configured by SESSION_CACHE_TTL (seconds, 30 by
+    default, 0 to disable) and SESSION_CACHE_SIZE (10000).
+    """
+    return SessionCache(ttl=float(os.getenv("SESSION_CACHE_TTL", 30)),
+                        max_size=int(os.getenv("SESSION_CACHE_SIZE", 10000)))
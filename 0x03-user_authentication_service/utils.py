@@ -7,11 +7,13 @@ are present in the request body before processing the request. It helps
 in standardizing the validation process across different endpoints.
 """
 
-from typing import Any, Tuple, Union
+from typing import Any, Mapping, Tuple, Union
 from flask import request
 
 
-def _check_form_data_field_existence(*, expected_fields: set) -> None:
+def _check_form_data_field_existence(
+    *, expected_fields: set, form: Mapping = None
+) -> None:
     """
     Internal helper function to verify the presence of expected fields in the
     request body.
@@ -23,20 +25,24 @@ def _check_form_data_field_existence(*, expected_fields: set) -> None:
     Args:
         expected_fields (set): A set of field names expected to be in
         the request body.
+        form (Mapping): The form data to check, defaults to the form of
+        the current Flask request.
 
     Raises:
         ValueError: If the request body is empty or if any expected
         field is missing.
     """
-    if not request.form:
+    if form is None:
+        form = request.form
+    if not form:
         raise ValueError({"expected_fields": list(expected_fields)})
     for field in expected_fields:
-        if not request.form.get(field):
+        if not form.get(field):
             raise ValueError(f"{field} missing")
 
 
 def request_body_provided(
-    *, expected_fields: set
+    *, expected_fields: set, form: Mapping = None
 ) -> Union[Tuple[bool, Any], Tuple[bool, None]]:
     """
     Validate the presence of required fields in the request body.
@@ -45,6 +51,8 @@ def request_body_provided(
     Args:
         expected_fields (set): A set of field names expected to be in the
         request body.
+        form (Mapping): The form data to check, for requests not served
+        by Flask (see app_async).
 
     Returns:
         Tuple[bool, Any]: A tuple where the first element is a boolean
@@ -52,7 +60,8 @@ def request_body_provided(
         element is either `None` (on success) or an error message (on failure).
     """
     try:
-        _check_form_data_field_existence(expected_fields=expected_fields)
+        _check_form_data_field_existence(expected_fields=expected_fields,
+                                         form=form)
     except ValueError as err:
         return False, err.args[0]
 